@@ -6,6 +6,7 @@ import umap
 from matplotlib.colors import LinearSegmentedColormap
 
 import src.data.CleanFrame as cf
+from src.data.LazyFrame import LazyCleanFrame
 
 
 class CleanFrame(pd.core.frame.DataFrame):
@@ -20,6 +21,8 @@ class CleanFrame(pd.core.frame.DataFrame):
         Cleans column names by stripping white space, removing white space, and converting all characters to either lower or upper case
     filter_by_val:
         Select rows based on values in a given column
+    lazy:
+        Record chained cleaning steps, fused and run once on collect()
     volcano:
         Makes volcano plots
     umap:
@@ -138,6 +141,19 @@ class CleanFrame(pd.core.frame.DataFrame):
         else:
             return new_data
 
+    def lazy(self):
+        """Record chained operations to be optimised and run at once
+
+        clean_cols, filter_by_val, column drops, dropna and column renames called
+        on the result are fused into a single pass over the data when collect() is
+        called. See src.data.LazyFrame for details.
+
+        Outputs
+        -------
+        lazy: LazyCleanFrame
+        """
+        return LazyCleanFrame(self)
+
     def volcano(
         self,
         x,
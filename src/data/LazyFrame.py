@@ -0,0 +1,303 @@
+"""Lazy query plans for chained CleanFrame operations
+
+Eager chains such as make_data's
+
+    cf.clean_cols().filter_by_val(...).drop(columns=...).dropna()
+
+copy the whole frame at every step. CleanFrame.lazy() returns a LazyCleanFrame that
+only records the steps. On collect() they are optimised and run once:
+
+    column renames (clean_cols, rename, rename_axis) only change the final labels
+    column drops become a projection, so dropped columns are never copied
+    filter_by_val and dropna are fused into a single row mask
+    the mask and projection are applied together, with one take
+
+Operations that reorder or reshape the data (sort_values, reset_index, transpose, pipe)
+are run as they are, and each starts a new stage of fused operations.
+explain() shows the optimised plan.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _positions(labels, key):
+    """Positions in labels matched by key, as DataFrame.drop would find them"""
+    loc = labels.get_loc(key)
+    if isinstance(loc, slice):
+        return np.arange(len(labels))[loc]
+    if isinstance(loc, np.ndarray):
+        return np.flatnonzero(loc)
+    return np.array([loc])
+
+
+def _describe(labels, limit=4):
+    shown = ", ".join(str(i) for i in labels[:limit])
+    return shown + (f", ... ({len(labels)} columns)" if len(labels) > limit else "")
+
+
+class _Stage:
+    """A fused projection, row mask and relabel over the columns of its input
+
+    Attributes
+    ----------
+    positions: np.ndarray
+        Positions, in the stage's input, of the columns still selected
+    labels: pd.Index
+        Current labels of those columns
+    predicates: list
+        (kind, input positions, arguments) row conditions, combined with and
+    relabelled: bool
+        Whether any operation has changed the labels
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.positions = np.arange(len(columns))
+        self.labels = columns
+        self.predicates = []
+        self.relabelled = False
+
+    def relabel(self, labels):
+        self.labels = labels
+        self.relabelled = True
+
+    def drop(self, keys, errors="raise"):
+        keys = [keys] if not isinstance(keys, (list, tuple, pd.Index)) else keys
+        dropped = []
+        for key in keys:
+            try:
+                dropped.append(_positions(self.labels, key))
+            except KeyError:
+                if errors == "raise":
+                    raise
+        keep = np.ones(len(self.labels), dtype=bool)
+        if dropped:
+            keep[np.concatenate(dropped)] = False
+        self.positions = self.positions[keep]
+        self.labels = self.labels[keep]
+
+    def source(self, key):
+        """Input position of the single column labelled key"""
+        found = _positions(self.labels, key)
+        if found.size != 1:
+            raise ValueError(f"{key} must identify a single column")
+        return self.positions[found[0]]
+
+    def explain(self):
+        lines = []
+        for kind, positions, args in self.predicates:
+            names = _describe(self.columns[positions])
+            if kind == "isin":
+                vals, keep = args
+                lines.append(f"{names} {'in' if keep else 'not in'} {list(vals)}")
+            else:
+                lines.append(f"dropna(how={args!r}) on {names}")
+        out = []
+        if lines:
+            out.append("  Filter: " + "\n      and ".join(lines))
+        if len(self.positions) != len(self.columns):
+            out.append(
+                f"  Project: {len(self.positions)} of {len(self.columns)} columns"
+            )
+        if self.relabelled:
+            out.append(f"  Relabel columns: {_describe(self.labels)}")
+        return out
+
+    def identity(self):
+        """Whether every column is kept, in its original position"""
+        return len(self.positions) == len(self.columns) and np.array_equal(
+            self.positions, np.arange(len(self.columns))
+        )
+
+    def trivial(self):
+        """Whether the stage leaves the data as it is"""
+        return not (self.predicates or self.relabelled) and self.identity()
+
+    def run(self, data):
+        """Apply the stage to data with one take, always returning a new frame"""
+        mask = None
+        for kind, positions, args in self.predicates:
+            if kind == "isin":
+                vals, keep = args
+                found = data.iloc[:, positions[0]].isin(vals).to_numpy()
+                found = found if keep else ~found
+            else:
+                notna = data.iloc[:, positions].notna().to_numpy()
+                found = notna.all(axis=1) if args == "any" else notna.any(axis=1)
+            mask = found if mask is None else mask & found
+        identity = self.identity()
+        if mask is None and identity:
+            new_data = data.copy()
+        elif mask is None:
+            new_data = data.iloc[:, self.positions]
+        else:
+            rows = np.flatnonzero(mask)
+            new_data = data.iloc[rows] if identity else data.iloc[rows, self.positions]
+        if self.relabelled:
+            new_data.columns = self.labels
+        return new_data
+
+
+# Operations folded into a _Stage; any other is run as it is
+_FUSED = ("clean_cols", "rename", "rename_axis", "drop", "filter_by_val", "dropna")
+
+
+class LazyCleanFrame:
+    """Records CleanFrame operations, optimising and running them on collect()
+
+    Methods
+    -------
+    clean_cols, filter_by_val, drop, dropna, rename, rename_axis:
+        Fused into a single pass
+    sort_values, reset_index, transpose/T, pipe:
+        Run as they are, between fused passes
+    explain:
+        Describe the optimised plan
+    collect:
+        Run the plan, returning a CleanFrame
+    """
+
+    def __init__(self, data, ops=None):
+        self.data = data
+        self.ops = [] if ops is None else list(ops)
+
+    def _with(self, name, *args, **kwargs):
+        if kwargs.get("inplace", False):
+            raise ValueError("LazyCleanFrame does not support inplace")
+        return self.__class__(self.data, self.ops + [(name, args, kwargs)])
+
+    def __repr__(self):
+        return f"LazyCleanFrame({len(self.ops)} pending operations)"
+
+    # Operations fused into a stage
+    def clean_cols(self, **kwargs):
+        """Lazy CleanFrame.clean_cols"""
+        return self._with("clean_cols", **kwargs)
+
+    def filter_by_val(self, col="", vals=[], keep=True):
+        """Lazy CleanFrame.filter_by_val"""
+        for i in (keep,):
+            if not isinstance(i, bool):
+                raise ValueError(f"{i} must be a bool")
+        if not isinstance(col, str):
+            raise ValueError("col must be a str in self.columns")
+        if not isinstance(vals, (list, tuple)):
+            raise ValueError("vals must be a list or tuple")
+        return self._with("filter_by_val", col=col, vals=vals, keep=keep)
+
+    def drop(self, columns=None, errors="raise"):
+        """Lazy DataFrame.drop, of columns only"""
+        if columns is None:
+            raise ValueError("LazyCleanFrame can only drop columns")
+        return self._with("drop", columns=columns, errors=errors)
+
+    def dropna(self, axis=0, how="any", subset=None):
+        """Lazy DataFrame.dropna, of rows only"""
+        if axis not in (0, "index"):
+            raise ValueError("LazyCleanFrame can only drop rows")
+        if how not in ("any", "all"):
+            raise ValueError("how must be 'any' or 'all'")
+        return self._with("dropna", how=how, subset=subset)
+
+    def rename(self, columns=None):
+        """Lazy DataFrame.rename, of columns only"""
+        return self._with("rename", columns=columns)
+
+    def rename_axis(self, columns=None):
+        """Lazy DataFrame.rename_axis, of the columns only"""
+        return self._with("rename_axis", columns=columns)
+
+    # Operations run as they are
+    def sort_values(self, *args, **kwargs):
+        return self._with("sort_values", *args, **kwargs)
+
+    def reset_index(self, *args, **kwargs):
+        return self._with("reset_index", *args, **kwargs)
+
+    def transpose(self):
+        return self._with("transpose")
+
+    @property
+    def T(self):
+        return self.transpose()
+
+    def pipe(self, func, *args, **kwargs):
+        """Lazily apply func(frame, *args, **kwargs)"""
+        if not callable(func):
+            raise ValueError("func must be callable")
+        return self._with("pipe", func, *args, **kwargs)
+
+    def _plan(self, columns):
+        """Fuse the leading operations into one stage over columns
+
+        Outputs
+        -------
+        stage: _Stage
+        eager: tuple or None
+            The (name, args, kwargs) operation that ended the stage
+        rest: list
+            The operations after eager, planned once its output columns are known
+        """
+        stage = _Stage(columns)
+        for i, (name, args, kwargs) in enumerate(self.ops):
+            if name not in _FUSED:
+                return stage, (name, args, kwargs), self.ops[i + 1 :]
+            if name == "drop":
+                stage.drop(kwargs["columns"], errors=kwargs["errors"])
+            elif name == "filter_by_val":
+                position = stage.source(kwargs["col"])
+                args = (kwargs["vals"], kwargs["keep"])
+                stage.predicates.append(("isin", np.array([position]), args))
+            elif name == "dropna":
+                if kwargs["subset"] is None:
+                    positions = stage.positions
+                else:
+                    positions = np.array([stage.source(i) for i in kwargs["subset"]])
+                stage.predicates.append(("notna", positions, kwargs["how"]))
+            else:
+                # Renames only ever touch the labels, so run them on an empty frame
+                empty = self.data.__class__(columns=stage.labels)
+                stage.relabel(getattr(empty, name)(**kwargs).columns)
+        return stage, None, []
+
+    def explain(self):
+        """The optimised plan, as a str
+
+        Stages after an eager step depend on its output columns, so only the
+        operations they fuse are listed.
+        """
+        stage, eager, rest = self._plan(self.data.columns)
+        lines = [f"Scan {_describe(self.data.columns)}"]
+        if stage.explain():
+            lines += ["Fused stage"] + stage.explain()
+        while eager is not None:
+            lines.append(f"Eager {eager[0]}")
+            fused = []
+            while rest and rest[0][0] in _FUSED:
+                fused.append(rest.pop(0)[0])
+            if fused:
+                lines.append(f"Fused stage: {', '.join(fused)}")
+            eager = rest.pop(0) if rest else None
+        return "\n".join(lines)
+
+    def collect(self):
+        """Run the optimised plan
+
+        Outputs
+        -------
+        new_data: CleanFrame
+        """
+        data, ops = self.data, self.ops
+        while True:
+            stage, eager, ops = self.__class__(data, ops)._plan(data.columns)
+            if eager is None:
+                return stage.run(data)
+            # The eager step makes its own copy
+            if not stage.trivial():
+                data = stage.run(data)
+            name, args, kwargs = eager
+            if name == "pipe":
+                data = args[0](data, *args[1:], **kwargs)
+            else:
+                data = getattr(data, name)(*args, **kwargs)
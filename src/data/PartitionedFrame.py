@@ -0,0 +1,234 @@
+"""A partitioned, lazily evaluated CleanFrame for data larger than memory
+
+A PartitionedCleanFrame is a list of partitions, each a batch file or any other source
+of CleanFrame chunks, plus a list of pending operations. Calling clean_cols,
+filter_by_val, drop or dropna only records the operation. Nothing is read until the
+data is iterated over, one chunk at a time, or compute() concatenates it, as make_data
+does, into a single CleanFrame.
+
+Only row-wise operations are offered, so applying them chunk by chunk gives the same
+result as applying them to the whole frame.
+"""
+
+import glob
+from functools import partial
+
+import pandas as pd
+
+import src.data.CleanFrame as cf
+
+
+def _read_chunks(path, chunksize, read_kwargs):
+    """Read a delimited file, all at once or chunksize rows at a time"""
+    if chunksize is None:
+        return [pd.read_csv(path, **read_kwargs)]
+    return pd.read_csv(path, chunksize=chunksize, **read_kwargs)
+
+
+def _as_chunks(frame):
+    return [frame]
+
+
+class PartitionedCleanFrame:
+    """Lazily evaluated CleanFrame split into partitions
+
+    Methods
+    -------
+    from_files:
+        One partition per file matching a glob, optionally read in chunks
+    from_frames:
+        One partition per in-memory DataFrame
+    clean_cols, filter_by_val, drop, dropna:
+        Record the CleanFrame/DataFrame method, to be run on every chunk
+    map_partitions:
+        Record an arbitrary function, to be run on every chunk
+    iter_partitions:
+        Yield the processed chunks of each partition, one at a time
+    compute:
+        Concatenate every processed partition into one CleanFrame
+    to_pickles:
+        Write each processed partition to its own pickle without materialising the
+        others
+    """
+
+    def __init__(self, partitions, keys=None, ops=None, concat=None):
+        """
+        Inputs
+        ------
+        partitions: list of callables
+            Each returns an iterable of DataFrame chunks when called
+        keys: list-like, optional
+            A label for each partition, used as the outer level by compute
+        ops: list, optional
+            Pending (method name or function, kwargs) operations
+        concat: dict, optional
+            Default pd.concat parameters used by compute
+        """
+        if keys is not None and len(keys) != len(partitions):
+            raise ValueError("keys must have one label per partition")
+        self.partitions = list(partitions)
+        self.keys = None if keys is None else list(keys)
+        self.ops = [] if ops is None else list(ops)
+        self.concat = {} if concat is None else dict(concat)
+
+    @classmethod
+    def from_files(cls, files, chunksize=None, keys=None, concat=None, **read_kwargs):
+        """One partition per file matching files
+
+        Inputs
+        ------
+        files: str
+            A glob pattern matching the files, read in sorted order
+        chunksize: int, optional
+            If given, each file is streamed chunksize rows at a time
+        keys: list-like, optional
+            A label for each file
+        concat: dict, optional
+            Default pd.concat parameters used by compute
+        read_kwargs:
+            Additional parameters passed to pd.read_csv
+        """
+        if not isinstance(files, str):
+            raise ValueError(f"files must be a str, not {type(files)}")
+        if chunksize is not None and (not isinstance(chunksize, int) or chunksize < 1):
+            raise ValueError("chunksize must be a positive int")
+        paths = sorted(glob.glob(files))
+        partitions = [partial(_read_chunks, i, chunksize, read_kwargs) for i in paths]
+        return cls(partitions, keys=keys, concat=concat)
+
+    @classmethod
+    def from_frames(cls, frames, keys=None, concat=None):
+        """One partition per DataFrame in frames"""
+        return cls([partial(_as_chunks, i) for i in frames], keys=keys, concat=concat)
+
+    def __len__(self):
+        return len(self.partitions)
+
+    def __repr__(self):
+        ops = ", ".join(i if isinstance(i, str) else i.__name__ for i, _ in self.ops)
+        return f"PartitionedCleanFrame({len(self)} partitions, pending: [{ops}])"
+
+    def _with(self, op, kwargs):
+        if kwargs.get("inplace", False):
+            raise ValueError("PartitionedCleanFrame does not support inplace")
+        return self.__class__(
+            self.partitions,
+            keys=self.keys,
+            ops=self.ops + [(op, kwargs)],
+            concat=self.concat,
+        )
+
+    def clean_cols(
+        self,
+        strip=True,
+        spaces=True,
+        space_char="_",
+        lower=True,
+        upper=False,
+        inplace=False,
+    ):
+        """Lazy CleanFrame.clean_cols"""
+        for i in (strip, spaces, lower, upper):
+            if not isinstance(i, bool):
+                raise ValueError(f"{i} must be a bool")
+        if not isinstance(space_char, str):
+            raise ValueError("space_char must be a str")
+        kwargs = dict(
+            strip=strip, spaces=spaces, space_char=space_char, lower=lower, upper=upper
+        )
+        return self._with("clean_cols", dict(kwargs, inplace=inplace))
+
+    def filter_by_val(self, col="", vals=[], keep=True, inplace=False):
+        """Lazy CleanFrame.filter_by_val"""
+        for i in (keep,):
+            if not isinstance(i, bool):
+                raise ValueError(f"{i} must be a bool")
+        if not isinstance(col, str):
+            raise ValueError("col must be a str in self.columns")
+        if not isinstance(vals, (list, tuple)):
+            raise ValueError("vals must be a list or tuple")
+        kwargs = dict(col=col, vals=vals, keep=keep, inplace=inplace)
+        return self._with("filter_by_val", kwargs)
+
+    def drop(self, labels=None, axis=0, index=None, columns=None, **kwargs):
+        """Lazy DataFrame.drop. Dropping rows by label acts within each chunk"""
+        kwargs = dict(kwargs, labels=labels, axis=axis, index=index, columns=columns)
+        return self._with("drop", kwargs)
+
+    def dropna(self, axis=0, **kwargs):
+        """Lazy DataFrame.dropna. Only rows can be dropped"""
+        if axis not in (0, "index"):
+            raise ValueError("PartitionedCleanFrame can only drop rows")
+        return self._with("dropna", dict(kwargs, axis=0))
+
+    def map_partitions(self, func, **kwargs):
+        """Lazily apply func(chunk, **kwargs) to every chunk
+
+        func must return a DataFrame and treat each row independently.
+        """
+        if not callable(func):
+            raise ValueError("func must be callable")
+        return self._with(func, kwargs)
+
+    def _apply(self, chunk):
+        chunk = cf.CleanFrame(chunk)
+        for op, kwargs in self.ops:
+            if isinstance(op, str):
+                chunk = getattr(chunk, op)(**kwargs)
+            else:
+                chunk = op(chunk, **kwargs)
+        return chunk
+
+    def iter_partitions(self):
+        """Yield (key, chunk) for every processed chunk, reading one at a time
+
+        key is the partition's index if no keys were given
+        """
+        keys = range(len(self)) if self.keys is None else self.keys
+        for key, partition in zip(keys, self.partitions):
+            for chunk in partition():
+                yield key, self._apply(chunk)
+
+    def _partition(self, i):
+        """One whole processed partition"""
+        chunks = [self._apply(chunk) for chunk in self.partitions[i]()]
+        return cf.CleanFrame(pd.concat(chunks, axis=0, sort=False, copy=False))
+
+    def compute(self, **kwargs):
+        """Materialise every partition and concatenate them into one CleanFrame
+
+        Inputs
+        ------
+        kwargs:
+            pd.concat parameters, overriding those given on creation
+
+        Outputs
+        -------
+        data: CleanFrame
+        """
+        concat = dict(self.concat, **kwargs)
+        concat.setdefault("keys", self.keys)
+        frames = (self._partition(i) for i in range(len(self)))
+        return cf.CleanFrame(pd.concat(frames, sort=False, copy=False, **concat))
+
+    def to_pickles(self, path):
+        """Write each processed partition to path.format(key), one at a time
+
+        Inputs
+        ------
+        path: str
+            Format string with one replacement field, ie. 'data/interim/part_{}.pkl'
+
+        Outputs
+        -------
+        paths: list
+            The files written
+        """
+        if not isinstance(path, str):
+            raise ValueError("path must be a str")
+        keys = range(len(self)) if self.keys is None else self.keys
+        paths = []
+        for i, key in enumerate(keys):
+            paths.append(path.format(key))
+            pd.to_pickle(self._partition(i), paths[-1])
+        return paths
@@ -19,14 +19,43 @@ The necessary files are:
 """
 
 import glob
-
+import hashlib
+import os
 import pandas as pd
 
 import src.data.CleanFrame as cf
+from src.data.PartitionedFrame import PartitionedCleanFrame
+from src.parallel import pool_map
+
+# Columns of the *__Proteins.txt files used, and the names given to them
+USECOLS = [2, 5, 9, 10, 72, 73, 74, 75, 76, 77, 78, 79]
+NAMES = [
+    "master",
+    "accession",
+    "q_score",
+    "pep_score",
+    "AD1",
+    "AD2",
+    "Control1",
+    "Control2",
+    "PD1",
+    "PD2",
+    "ADPD1",
+    "ADPD2",
+]
 
 
 def make_data(
-    files, usecols=None, names=None, index_col=None, axis=0, join="outer", keys=None
+    files,
+    usecols=None,
+    names=None,
+    index_col=None,
+    axis=0,
+    join="outer",
+    keys=None,
+    dropna=True,
+    partitioned=False,
+    chunksize=None,
 ):
     """Make a full CleanFrame from multiple files
 
@@ -59,40 +88,67 @@ def make_data(
     keys: sequence, optional
         for pd.concat
         Construct hierarchal index using the passed keys as the outermost level
+    dropna: bool, default True
+        Whether to drop proteins with missing values from each file
+        Set to False to keep them for src.features.impute
+    partitioned: bool, default False
+        If true, return a PartitionedCleanFrame instead. Files are not read, nor
+        cleaned, until it is iterated over or computed.
+    chunksize: int, optional
+        If partitioned, stream each file chunksize rows at a time
 
     Returns
     -------
     data: src.data.CleanFrame.CleanFrame
         The full CleanFrame
+        Or src.data.PartitionedFrame.PartitionedCleanFrame, if partitioned
     """
     # Type check files
     if not isinstance(files, str):
         raise ValueError(f"files must be a str, not {type(files)}")
-    # Find files
-    paths = glob.iglob(files)
-    # Read in files, sep=None with engine='python' will auto determine delim
-    reads = (
-        pd.read_csv(
-            file,
-            usecols=usecols,
-            header=0,
-            names=names,
-            index_col=index_col,
-            sep=None,
-            engine="python",
-        )
-        for file in paths
+    for i in (dropna, partitioned):
+        if not isinstance(i, bool):
+            raise ValueError(f"{i} must be a bool")
+    # sep=None with engine='python' will auto determine delim
+    read_kwargs = dict(
+        usecols=usecols,
+        header=0,
+        names=names,
+        index_col=index_col,
+        sep=None,
+        engine="python",
     )
+    if partitioned:
+        data = (
+            PartitionedCleanFrame.from_files(
+                files,
+                chunksize=chunksize,
+                keys=keys,
+                concat=dict(axis=axis, join=join),
+                **read_kwargs,
+            )
+            .clean_cols()
+            .filter_by_val(col="master", vals=["IsMasterProtein"])
+            .drop(columns="master")
+        )
+        return data.dropna(axis=0) if dropna else data
+    # Find files, in sorted order so keys label the same files as partitioned=True
+    paths = sorted(glob.glob(files))
+    # Read in files
+    reads = (pd.read_csv(file, **read_kwargs) for file in paths)
     # Convert to CleanFrame
     cfs = (cf.CleanFrame(i) for i in reads)
-    # Clean data
+    # Clean data, fusing the steps into one pass over each file
     clean = (
-        i.clean_cols()
+        i.lazy()
+        .clean_cols()
         .filter_by_val(col="master", vals=["IsMasterProtein"])
         .drop(columns="master")
-        .dropna(axis=0)
         for i in cfs
     )
+    if dropna:
+        clean = (i.dropna(axis=0) for i in clean)
+    clean = (i.collect() for i in clean)
     # Create final CleanFrame
     data = cf.CleanFrame(
         pd.concat(clean, axis=axis, join=join, keys=keys, sort=False, copy=False)
@@ -100,25 +156,110 @@ def make_data(
     return data
 
 
+def _read_sheet(args):
+    """Parse one sheet of the summary workbook, resolving its two row header"""
+    path, sheet = args
+    return pd.read_excel(path, sheet_name=sheet, header=[0, 2])
+
+
+def _file_hash(path):
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _cached_sheet(cache, path, stat, digest):
+    """A cached sheet, if still valid, and the workbook's digest, if computed
+
+    After a hash hit the entry's mtime and size are rewritten, so the next call
+    does not hash the workbook again.
+    """
+    if not os.path.exists(cache):
+        return None, digest
+    cached = pd.read_pickle(cache)
+    if (cached["mtime"], cached["size"]) == (stat.st_mtime, stat.st_size):
+        return cached["data"], digest
+    digest = digest or _file_hash(path)
+    if cached["sha1"] != digest:
+        return None, digest
+    pd.to_pickle(dict(cached, mtime=stat.st_mtime, size=stat.st_size), cache)
+    return cached["data"], digest
+
+
+def read_summary(
+    path="references/TMT_Summary_Data.xlsx",
+    sheets=("frontal cortex", "anterior cingulate gyrus"),
+    cache_dir="data/interim",
+    n_jobs=2,
+):
+    """Read sheets of the TMT summary workbook, caching each as a pickle
+
+    Parsing the workbook is by far the slowest I/O in the project, so each sheet is
+    converted once and read from data/interim afterwards. A cache is reused while the
+    workbook's modification time and size are unchanged, or, if they have changed,
+    while its contents still hash the same. Sheets missing from the cache are parsed
+    in parallel.
+
+    Inputs
+    ------
+    path: str
+        Location of the workbook
+    sheets: list-like
+        Names of the sheets to read
+    cache_dir: str
+        Directory to store the cached sheets in
+    n_jobs: int
+        Maximum number of processes used to parse sheets
+
+    Returns
+    -------
+    data: list of src.data.CleanFrame.CleanFrame
+        One per sheet, in the order given, with the header rows 0 and 2 as a
+        MultiIndex on the columns
+    """
+    # Type check inputs
+    for i in (path, cache_dir):
+        if not isinstance(i, str):
+            raise ValueError(f"{i} must be a str")
+    if not isinstance(sheets, (list, tuple)):
+        raise ValueError("sheets must be a list or tuple")
+    if not isinstance(n_jobs, int) or n_jobs < 1:
+        raise ValueError("n_jobs must be a positive int")
+
+    stat = os.stat(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = None
+    frames, cold = {}, []
+    for sheet in sheets:
+        cache = os.path.join(cache_dir, f"{stem}_{sheet.replace(' ', '_')}.pkl")
+        data, digest = _cached_sheet(cache, path, stat, digest)
+        if data is None:
+            cold.append((sheet, cache))
+        else:
+            frames[sheet] = data
+
+    if cold:
+        tasks = [(path, sheet) for sheet, _ in cold]
+        reads = pool_map(_read_sheet, tasks, n_jobs=min(n_jobs, len(tasks)))
+
+        digest = digest or _file_hash(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        for (sheet, cache), data in zip(cold, reads):
+            meta = {"mtime": stat.st_mtime, "size": stat.st_size, "sha1": digest}
+            pd.to_pickle(dict(meta, data=data), cache)
+            frames[sheet] = data
+
+    return [cf.CleanFrame(frames[sheet]) for sheet in sheets]
+
+
 if __name__ == "__main__":
     # Frontal cortex data
     frontal = make_data(
         "data/raw/f*",
-        usecols=[2, 5, 9, 10, 72, 73, 74, 75, 76, 77, 78, 79],
-        names=[
-            "master",
-            "accession",
-            "q_score",
-            "pep_score",
-            "AD1",
-            "AD2",
-            "Control1",
-            "Control2",
-            "PD1",
-            "PD2",
-            "ADPD1",
-            "ADPD2",
-        ],
+        usecols=USECOLS,
+        names=NAMES,
         index_col=1,
         axis=1,
         join="inner",
@@ -129,24 +270,11 @@ if __name__ == "__main__":
     # Anterior cingulate cortex data
     cingulate = make_data(
         "data/raw/c*",
-        usecols=[2, 5, 9, 10, 72, 73, 74, 75, 76, 77, 78, 79],
-        names=[
-            "master",
-            "accession",
-            "q_score",
-            "pep_score",
-            "AD1",
-            "AD2",
-            "Control1",
-            "Control2",
-            "PD1",
-            "PD2",
-            "ADPD1",
-            "ADPD2",
-        ],
+        usecols=USECOLS,
+        names=NAMES,
         index_col=1,
         axis=1,
         join="inner",
         keys=[1, 2, 3, 4, 5],
     )
-    pd.to_pickle(frontal, "data/interim/cingulate_full.pkl")
+    pd.to_pickle(cingulate, "data/interim/cingulate_full.pkl")
@@ -0,0 +1,284 @@
+"""Quality control summaries of the raw batch files
+
+Each *__Proteins.txt file is read once, in chunks, and every summary is accumulated
+from the same pass:
+
+    missing values per channel
+    count, mean, standard deviation, min and max per channel and score
+    a fixed-bin histogram of log2 values per channel and score, for quantiles
+    the number of master and non-master proteins
+
+The accumulators only hold counts and moments, so the summaries of separate chunks or
+files can be merged exactly. Files are processed in parallel, and the report is written
+next to the interim data.
+"""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+import src.data.CleanFrame as cf
+from src.data.make_dataset import NAMES, USECOLS
+from src.parallel import pool_map, shared
+
+# log2 bins shared by every histogram, so they can be merged
+BINS = np.linspace(-20, 40, 241)
+
+
+class Moments:
+    """Mergeable count, mean, sum of squared deviations, min and max per column"""
+
+    def __init__(self, n_cols):
+        self.n = np.zeros(n_cols)
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)
+        self.min = np.full(n_cols, np.inf)
+        self.max = np.full(n_cols, -np.inf)
+
+    def update(self, values):
+        """Add a (rows x columns) block of values, ignoring NaNs"""
+        observed = ~np.isnan(values)
+        n = observed.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, np.nansum(values, axis=0) / n, 0)
+        m2 = np.nansum((values - mean) ** 2, axis=0)
+        other = Moments(values.shape[1])
+        other.n, other.mean, other.m2 = n, mean, m2
+        if values.shape[0]:
+            other.min = np.where(observed, values, np.inf).min(axis=0)
+            other.max = np.where(observed, values, -np.inf).max(axis=0)
+        self.merge(other)
+
+    def merge(self, other):
+        """Combine with another Moments in place (Chan et al., 1979)"""
+        n = self.n + other.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = other.mean - self.mean
+            weight = np.where(n > 0, other.n / n, 0)
+        self.mean = self.mean + delta * weight
+        self.m2 = self.m2 + other.m2 + delta**2 * self.n * weight
+        self.n = n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+
+    @property
+    def std(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(self.m2 / (self.n - 1))
+
+
+class Histogram:
+    """Mergeable log2 histogram per column, with counts of non-positive values"""
+
+    def __init__(self, n_cols, bins=BINS):
+        self.bins = bins
+        self.counts = np.zeros((n_cols, bins.size - 1), dtype=np.int64)
+        self.non_positive = np.zeros(n_cols, dtype=np.int64)
+
+    def update(self, values):
+        """Add a (rows x columns) block of values, ignoring NaNs"""
+        n_bins = self.bins.size - 1
+        self.non_positive += (values <= 0).sum(axis=0)
+        positive = values > 0
+        rows, cols = np.nonzero(positive)
+        logs = np.log2(values[rows, cols])
+        index = np.clip(
+            np.searchsorted(self.bins, logs, side="right") - 1, 0, n_bins - 1
+        )
+        self.counts += np.bincount(
+            cols * n_bins + index, minlength=self.counts.size
+        ).reshape(self.counts.shape)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.non_positive += other.non_positive
+        return self
+
+    def quantiles(self, qs):
+        """Approximate quantiles of the positive values, on the original scale"""
+        cumulative = np.cumsum(self.counts, axis=1)
+        totals = cumulative[:, -1:]
+        out = np.full((self.counts.shape[0], len(qs)), np.nan)
+        mids = (self.bins[:-1] + self.bins[1:]) / 2
+        for j, q in enumerate(qs):
+            index = np.minimum((cumulative < q * totals).sum(axis=1), mids.size - 1)
+            out[:, j] = np.where(totals[:, 0] > 0, 2 ** mids[index], np.nan)
+        return out
+
+
+class BatchQC:
+    """All QC summaries of one batch file, accumulated chunk by chunk
+
+    Attributes
+    ----------
+    columns: list
+        Names of the channels and scores summarised
+    n_rows: int
+        Number of proteins seen
+    missing: np.ndarray
+        Missing values per column
+    moments: Moments
+    histogram: Histogram
+    masters: dict
+        Number of proteins with each value of the master column
+    """
+
+    def __init__(self, columns, master="master"):
+        self.columns = list(columns)
+        self.master = master
+        self.n_rows = 0
+        self.missing = np.zeros(len(self.columns), dtype=np.int64)
+        self.moments = Moments(len(self.columns))
+        self.histogram = Histogram(len(self.columns))
+        self.masters = {}
+
+    def update(self, chunk):
+        """Add a chunk of a batch file, as read by pd.read_csv"""
+        values = chunk[self.columns].to_numpy(dtype=np.float64)
+        self.n_rows += values.shape[0]
+        self.missing += np.isnan(values).sum(axis=0)
+        self.moments.update(values)
+        with np.errstate(invalid="ignore"):
+            self.histogram.update(values)
+        counts = chunk[self.master].fillna("missing").value_counts()
+        for key, count in counts.items():
+            self.masters[key] = self.masters.get(key, 0) + int(count)
+        return self
+
+    def merge(self, other):
+        """Combine with the QC of another chunk, or file, with the same columns"""
+        if other.columns != self.columns:
+            raise ValueError("Can only merge QC of the same columns")
+        self.n_rows += other.n_rows
+        self.missing += other.missing
+        self.moments.merge(other.moments)
+        self.histogram.merge(other.histogram)
+        for key, count in other.masters.items():
+            self.masters[key] = self.masters.get(key, 0) + count
+        return self
+
+    def summary(self):
+        """One row of statistics per column
+
+        Outputs
+        -------
+        summary: CleanFrame
+            Indexed by column, with the number of master and non-master proteins
+            repeated on every row
+        """
+        quartiles = self.histogram.quantiles((0.25, 0.5, 0.75))
+        n_master = self.masters.get("IsMasterProtein", 0)
+        return cf.CleanFrame(
+            {
+                "n_rows": self.n_rows,
+                "n_missing": self.missing,
+                "missing_frac": self.missing / max(self.n_rows, 1),
+                "mean": self.moments.mean,
+                "std": self.moments.std,
+                "min": self.moments.min,
+                "q25": quartiles[:, 0],
+                "median": quartiles[:, 1],
+                "q75": quartiles[:, 2],
+                "max": self.moments.max,
+                "n_non_positive": self.histogram.non_positive,
+                "n_master": n_master,
+                "n_non_master": sum(self.masters.values()) - n_master,
+            },
+            index=pd.Index(self.columns, name="column"),
+        )
+
+
+def qc_file(path, usecols=USECOLS, names=NAMES, chunksize=5000):
+    """Summarise one batch file in a single streaming pass
+
+    Inputs
+    ------
+    path: str
+        Location of the file
+    usecols: list-like
+        Columns to read, as for make_data
+    names: list-like
+        Names to give them. Must include master and accession.
+    chunksize: int
+        Number of rows read at a time
+
+    Outputs
+    -------
+    qc: BatchQC
+    """
+    if not isinstance(chunksize, int) or chunksize < 1:
+        raise ValueError("chunksize must be a positive int")
+    columns = [i.lower() for i in names if i not in ("master", "accession")]
+    qc = BatchQC(columns)
+    reader = pd.read_csv(
+        path,
+        usecols=usecols,
+        header=0,
+        names=names,
+        sep=None,
+        engine="python",
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        qc.update(cf.CleanFrame(chunk).clean_cols())
+    return qc
+
+
+def qc_report(files, n_jobs=1, out_dir="data/interim", name="qc_report", **kwargs):
+    """QC every file matching files, in parallel, and write the report
+
+    Inputs
+    ------
+    files: str
+        A glob pattern matching the batch files, as for make_data
+    n_jobs: int
+        Number of processes to use
+    out_dir: str, optional
+        Directory the report is written to, as <name>.pkl and <name>.csv
+        If None, nothing is written
+    name: str
+        File name of the report, without extension
+    kwargs:
+        Additional parameters passed to qc_file
+
+    Outputs
+    -------
+    report: CleanFrame
+        Indexed by (file, column)
+    """
+    # Type check inputs
+    if not isinstance(files, str):
+        raise ValueError(f"files must be a str, not {type(files)}")
+    if not isinstance(n_jobs, int) or n_jobs < 1:
+        raise ValueError("n_jobs must be a positive int")
+    paths = sorted(glob.glob(files))
+    if not paths:
+        raise ValueError(f"No files match {files}")
+
+    qcs = pool_map(_qc_file, paths, n_jobs=n_jobs, data=dict(kwargs=kwargs))
+
+    report = cf.CleanFrame(
+        pd.concat(
+            [qc.summary() for qc in qcs],
+            keys=[os.path.basename(path) for path in paths],
+            names=["file", "column"],
+        )
+    )
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+        pd.to_pickle(report, os.path.join(out_dir, f"{name}.pkl"))
+        report.to_csv(os.path.join(out_dir, f"{name}.csv"))
+    return report
+
+
+def _qc_file(path):
+    """qc_file with qc_report's shared keyword arguments, for pool_map"""
+    return qc_file(path, **shared["kwargs"])
+
+
+if __name__ == "__main__":
+    qc_report("data/raw/f*", n_jobs=5, name="frontal_qc")
+    qc_report("data/raw/c*", n_jobs=5, name="cingulate_qc")
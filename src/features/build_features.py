@@ -0,0 +1,282 @@
+"""Functions for turning the cleaned data into features for modelling
+
+make_data returns proteins as rows and a (batch, sample) MultiIndex on the columns,
+with the protein level scores stored alongside the TMT channel intensities.
+The functions here pull the numeric sample block out of that structure without
+routing it through object dtype intermediates.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import src.data.CleanFrame as cf
+
+SCORE_COLS = ("q_score", "pep_score")
+
+
+def channel_mask(columns, exclude=SCORE_COLS):
+    """Boolean mask of the intensity channels in a (batch, sample) MultiIndex
+
+    Inputs
+    ------
+    columns: pd.MultiIndex
+        Columns of a CleanFrame from make_data, with the sample as the last level
+    exclude: list-like
+        Sample names that are not intensity channels
+
+    Outputs
+    -------
+    mask: np.ndarray
+        True where the column is an intensity channel
+    """
+    if not isinstance(columns, pd.MultiIndex):
+        raise ValueError(f"columns must be a MultiIndex, not {type(columns)}")
+    samples = columns.get_level_values(-1)
+    return ~np.asarray(samples.isin(list(exclude)))
+
+
+class SampleMatrix:
+    """Samples x proteins matrix built directly from a make_data CleanFrame
+
+    Attributes
+    ----------
+    X: np.ndarray
+        C-contiguous float64 array of shape (n_samples, n_proteins)
+    label: pd.Categorical
+        Sample group, ie. 'ad1' -> 'ad'
+    batch: pd.Categorical
+        TMT batch each sample was run in
+    samples: pd.Index
+        Sample names, as they appeared in the columns
+    proteins: pd.Index
+        Protein accessions, in the order of the columns of X
+    """
+
+    def __init__(self, X, label, batch, samples, proteins):
+        self.X = X
+        self.label = label
+        self.batch = batch
+        self.samples = samples
+        self.proteins = proteins
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    @property
+    def shape(self):
+        return self.X.shape
+
+    def to_frame(self):
+        """Yield the matrix as a CleanFrame in the layout returned by prep_umap
+
+        The protein block wraps X without copying it, so changes to the frame's
+        protein columns are reflected in X.
+
+        Outputs
+        -------
+        frame: CleanFrame
+            batch and label columns, followed by one column per protein, indexed by
+            sample name
+        """
+        frame = cf.CleanFrame(
+            self.X,
+            index=pd.Index(self.samples, name="sample"),
+            columns=self.proteins,
+            copy=False,
+        )
+        frame.insert(0, "label", self.label)
+        frame.insert(0, "batch", self.batch)
+        return frame
+
+
+def build_sample_matrix(cf, exclude=SCORE_COLS, sort=True):
+    """Build a SampleMatrix from the (batch, sample) columns of a make_data CleanFrame
+
+    Equivalent to prep_umap, but only the numeric intensity block is touched.
+    Labels are extracted once per unique sample name rather than per row.
+
+    Inputs
+    ------
+    cf: CleanFrame
+        Proteins as rows, (batch, sample) MultiIndex as columns
+    exclude: list-like
+        Sample names that are not intensity channels
+    sort: bool
+        If true, samples are ordered by sample name, keeping batch order within a name
+
+    Outputs
+    -------
+    matrix: SampleMatrix
+    """
+    if not isinstance(sort, bool):
+        raise ValueError(f"{sort} must be a bool")
+
+    mask = channel_mask(cf.columns, exclude=exclude)
+    columns = cf.columns[mask]
+    batch = columns.get_level_values(0)
+    samples = columns.get_level_values(-1)
+
+    # Regex runs over the handful of unique sample names, then is broadcast back
+    names = pd.Index(samples.unique())
+    groups = names.str.extract(r"(\D+)", expand=False)
+    label = pd.Categorical(np.asarray(groups)[names.get_indexer(samples)])
+    batch = pd.Categorical(np.asarray(batch))
+
+    # Select the intensity block positionally and lay it out samples first
+    X = cf.iloc[:, np.flatnonzero(mask)].to_numpy(dtype=np.float64).T
+
+    if sort:
+        order = np.argsort(np.asarray(samples), kind="mergesort")
+        X, label, batch, samples = X[order], label[order], batch[order], samples[order]
+
+    return SampleMatrix(
+        X=np.ascontiguousarray(X),
+        label=label,
+        batch=batch,
+        samples=samples,
+        proteins=cf.index,
+    )
+
+
+def _median_center(block, log=True):
+    """Align the median of every channel to the median of the channel medians
+
+    Channels with no observations, or a non-positive median on the raw scale, are
+    left as they are rather than spreading NaNs to the rest of the batch.
+    """
+    with warnings.catch_warnings():
+        # All-NaN channels are expected with outer joined batches
+        warnings.simplefilter("ignore", RuntimeWarning)
+        medians = np.nanmedian(block, axis=0)
+    usable = np.isfinite(medians) if log else np.isfinite(medians) & (medians > 0)
+    if not usable.any():
+        return block.copy()
+    target = np.median(medians[usable])
+    if log:
+        return block - np.where(usable, medians - target, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return block * np.where(usable, target / medians, 1)
+
+
+def _quantile_normalize(block):
+    """Give every channel the same distribution, the mean of the sorted channels
+
+    Missing values stay missing. Channels with fewer observations are mapped onto
+    the reference distribution by interpolating on their rank.
+    """
+    n_rows, n_cols = block.shape
+    missing = np.isnan(block)
+    counts = n_rows - missing.sum(axis=0)
+    # NaNs sort to the end of each channel
+    order = np.argsort(block, axis=0, kind="mergesort")
+    ranked = np.take_along_axis(block, order, axis=0)
+    with np.errstate(invalid="ignore"):
+        reference = np.nanmean(ranked, axis=1)
+    reference = reference[~np.isnan(reference)]
+    if reference.size == 0:
+        return block.copy()
+
+    out = np.full_like(block, np.nan)
+    positions = np.arange(n_rows, dtype=np.float64)
+    grid = np.linspace(0, 1, reference.size)
+    for j in range(n_cols):
+        n = counts[j]
+        if n == 0:
+            continue
+        if n == reference.size:
+            values = reference
+        else:
+            values = np.interp(positions[:n] / max(n - 1, 1), grid, reference)
+        out[order[:n, j], j] = values
+    return out
+
+
+def _reference_ratio(block, ref, log=True):
+    """Express every channel relative to a reference channel, or their row mean"""
+    if ref is None:
+        with np.errstate(invalid="ignore"):
+            reference = np.nanmean(block, axis=1, keepdims=True)
+    else:
+        reference = block[:, [ref]]
+    if log:
+        return block - reference
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return block / reference
+
+
+def _reference_position(samples, reference, batch):
+    """Position of the reference channel among one batch's samples"""
+    found = np.flatnonzero(np.asarray(samples == reference))
+    if found.size != 1:
+        raise ValueError(f"{reference} not found in batch {batch}")
+    return found[0]
+
+
+def _normalize_block(block, method, log=True, ref=None):
+    """Log transform and normalize one batch's (proteins x channels) array"""
+    if log:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            block = np.log2(np.where(block > 0, block, np.nan))
+    if method == "median":
+        return _median_center(block, log=log)
+    if method == "quantile":
+        return _quantile_normalize(block)
+    if method == "reference":
+        return _reference_ratio(block, ref, log=log)
+    return block
+
+
+def normalize(cf, method="median", log=True, reference=None, exclude=SCORE_COLS):
+    """Normalize the TMT channels of a make_data CleanFrame within each batch
+
+    Each batch's channels are pulled out as one (proteins x channels) array and
+    every step is applied to that array as a whole, so the data is passed over
+    once per batch. Score columns are returned untouched.
+
+    Inputs
+    ------
+    cf: CleanFrame
+        Proteins as rows, (batch, sample) MultiIndex as columns
+    method: {'median', 'quantile', 'reference', None}
+        median: centre every channel on the batch's median of channel medians
+        quantile: give every channel in a batch the same distribution
+        reference: ratio every channel to the reference channel
+        None: apply only the log transform
+    log: bool
+        Whether to log2 transform the intensities first. Non-positive values
+        become NaN.
+    reference: str, optional
+        Sample name of the reference channel, present in every batch
+        If None and method='reference', the mean of the batch's channels is used
+    exclude: list-like
+        Sample names that are not intensity channels
+
+    Outputs
+    -------
+    new_data: CleanFrame
+        The normalized CleanFrame
+    """
+    # Type check inputs
+    if method not in ("median", "quantile", "reference", None):
+        raise ValueError(f"{method} is not a recognised normalization method")
+    if not isinstance(log, bool):
+        raise ValueError(f"{log} must be a bool")
+    if reference is not None and not isinstance(reference, str):
+        raise ValueError("reference must be a str")
+
+    mask = channel_mask(cf.columns, exclude=exclude)
+    batches = cf.columns.get_level_values(0)
+    samples = cf.columns.get_level_values(-1)
+    values = cf.to_numpy(dtype=np.float64)
+    out = values.copy()
+
+    for batch in batches.unique():
+        idx = np.flatnonzero(mask & np.asarray(batches == batch))
+        ref = None
+        if method == "reference" and reference is not None:
+            ref = _reference_position(samples[idx], reference, batch)
+        out[:, idx] = _normalize_block(values[:, idx], method, log=log, ref=ref)
+
+    return cf.__class__(out, index=cf.index, columns=cf.columns)
@@ -0,0 +1,220 @@
+"""Missing value imputation for the batch-concatenated proteome
+
+With make_data(..., dropna=False, join="outer") proteins missed in any batch are kept
+as NaN instead of being discarded. Two imputations are offered:
+
+    minprob: left-censored draws, assuming values are missing because they fell
+        below the detection limit (MinProb, as in the imputeLCMD R package)
+    knn: the mean of the k most similar fully observed proteins (Troyanskaya 2001)
+
+Both work on whole (proteins x channels) arrays, and can be run per batch in parallel.
+"""
+
+import numpy as np
+
+from src.features.build_features import SCORE_COLS, channel_mask
+from src.parallel import pool_map, spawn_seeds
+
+
+def impute_minprob(X, q=0.01, tune_sigma=1.0, random_state=None):
+    """Replace missing values with draws from a low, narrow normal distribution
+
+    For each channel, draws are centred on the q-th quantile of the observed values.
+    The spread is the median protein standard deviation, scaled by tune_sigma.
+    X must be log-scale: on raw intensities the draws can be negative. Use
+    impute(..., log=True) for raw data.
+
+    Inputs
+    ------
+    X: np.ndarray
+        proteins x channels array of log intensities containing NaNs
+    q: float
+        Quantile of each channel used as the mean of the draws
+    tune_sigma: float
+        Scaling applied to the median protein standard deviation
+    random_state: int or np.random.RandomState, optional
+        Seed for the draws
+
+    Outputs
+    -------
+    new_X: np.ndarray
+        Copy of X with its NaNs filled
+    """
+    if not 0 < q < 1:
+        raise ValueError("q must be between 0 and 1")
+    rng = np.random.RandomState(random_state)
+    missing = np.isnan(X)
+    if not missing.any():
+        return X.copy()
+
+    means = np.nanpercentile(X, q * 100, axis=0)
+    observed = (~missing).sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        sds = np.nanstd(X[observed > 1], axis=1, ddof=1)
+    sd = np.median(sds[np.isfinite(sds)]) * tune_sigma if np.isfinite(sds).any() else 0
+
+    draws = rng.normal(loc=means, scale=sd, size=X.shape)
+    return np.where(missing, draws, X)
+
+
+def _nan_sq_distances(targets, donors, donors_sq):
+    """Squared euclidean distances from partially observed targets to complete donors
+
+    Only the coordinates observed in the target contribute, and the sum is scaled up
+    by the fraction observed. Computed as three matrix products over the block.
+    """
+    observed = ~np.isnan(targets)
+    filled = np.where(observed, targets, 0)
+    n_obs = observed.sum(axis=1, keepdims=True)
+    d2 = (
+        (filled ** 2).sum(axis=1, keepdims=True)
+        - 2 * filled @ donors.T
+        + observed.astype(np.float64) @ donors_sq.T
+    )
+    np.maximum(d2, 0, out=d2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d2 *= targets.shape[1] / n_obs
+    return d2
+
+
+def impute_knn(X, k=10, block_size=1024):
+    """Replace missing values with the mean of the k nearest fully observed proteins
+
+    Distances between proteins are measured across channels, using only the channels
+    observed in the protein being imputed. They are computed block_size proteins at a
+    time with matrix products, bounding memory at block_size x n_donors.
+    Proteins with no observed channels are filled with the donors' channel means.
+
+    Inputs
+    ------
+    X: np.ndarray
+        proteins x channels array containing NaNs
+    k: int
+        Number of neighbours to average
+    block_size: int
+        Number of proteins with missing values handled per block
+
+    Outputs
+    -------
+    new_X: np.ndarray
+        Copy of X with its NaNs filled
+    """
+    for var in (k, block_size):
+        if not isinstance(var, (int, np.integer)) or var < 1:
+            raise ValueError(f"{var} must be a positive int")
+    new_X = X.copy()
+    missing = np.isnan(X)
+    incomplete = np.flatnonzero(missing.any(axis=1))
+    if incomplete.size == 0:
+        return new_X
+
+    donors = X[~missing.any(axis=1)]
+    if donors.shape[0] == 0:
+        raise ValueError("knn imputation requires at least one complete protein")
+    k = min(k, donors.shape[0])
+    donors_sq = donors ** 2
+    fallback = donors.mean(axis=0)
+
+    for start in range(0, incomplete.size, block_size):
+        rows = incomplete[start : start + block_size]
+        targets = X[rows]
+        d2 = _nan_sq_distances(targets, donors, donors_sq)
+        if k < donors.shape[0]:
+            nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.broadcast_to(np.arange(k), (rows.size, k))
+        estimate = donors[nearest].mean(axis=1)
+        empty = ~np.isfinite(d2).any(axis=1)
+        estimate[empty] = fallback
+        new_X[rows] = np.where(missing[rows], estimate, targets)
+    return new_X
+
+
+def _impute_block(args):
+    """Worker for impute; unpacks so it can be sent to a process pool"""
+    block, method, random_state, kwargs = args
+    if method == "minprob":
+        return impute_minprob(block, random_state=random_state, **kwargs)
+    return impute_knn(block, **kwargs)
+
+
+def impute(
+    cf,
+    method="minprob",
+    by_batch=None,
+    n_jobs=1,
+    exclude=SCORE_COLS,
+    random_state=None,
+    log=False,
+    **kwargs,
+):
+    """Impute the missing intensities of a make_data CleanFrame
+
+    Inputs
+    ------
+    cf: CleanFrame
+        Proteins as rows, (batch, sample) MultiIndex as columns
+    method: {'minprob', 'knn'}
+        See impute_minprob and impute_knn
+    by_batch: bool, optional
+        If true, each batch's channels are imputed separately, and in parallel
+        when n_jobs > 1. Otherwise all channels are imputed together.
+        Defaults to true for minprob and false for knn: with outer joined batches a
+        protein missed by a batch has none of its channels, so knn needs the other
+        batches' channels to find its neighbours.
+    n_jobs: int
+        Number of processes to use when by_batch=True
+    exclude: list-like
+        Sample names that are not intensity channels, left untouched
+    random_state: int, optional
+        Seed for minprob. Each batch gets its own seed derived from it, so results
+        do not depend on n_jobs.
+    log: bool
+        If true, the channels are raw intensities. They are imputed on the log2
+        scale, which minprob assumes, and returned on the raw scale. Non-positive
+        intensities are treated as missing.
+    kwargs:
+        Additional parameters passed to impute_minprob or impute_knn
+
+    Outputs
+    -------
+    new_data: CleanFrame
+        The imputed CleanFrame
+    """
+    # Type check inputs
+    if method not in ("minprob", "knn"):
+        raise ValueError(f"{method} is not a recognised imputation method")
+    if by_batch is None:
+        by_batch = method == "minprob"
+    for i in (by_batch, log):
+        if not isinstance(i, bool):
+            raise ValueError(f"{i} must be a bool")
+    if not isinstance(n_jobs, int) or n_jobs < 1:
+        raise ValueError("n_jobs must be a positive int")
+
+    mask = channel_mask(cf.columns, exclude=exclude)
+    values = cf.to_numpy(dtype=np.float64)
+    if log:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            channels = np.log2(values[:, mask])
+        channels[~np.isfinite(channels)] = np.nan
+        values[:, mask] = channels
+    if by_batch:
+        batches = cf.columns.get_level_values(0)
+        groups = [
+            np.flatnonzero(mask & np.asarray(batches == batch))
+            for batch in batches.unique()
+        ]
+    else:
+        groups = [np.flatnonzero(mask)]
+
+    seeds = spawn_seeds(random_state, len(groups))
+    tasks = [
+        (values[:, idx], method, seed, kwargs) for idx, seed in zip(groups, seeds)
+    ]
+    blocks = pool_map(_impute_block, tasks, n_jobs=min(n_jobs, len(tasks)))
+
+    out = values.copy()
+    for idx, block in zip(groups, blocks):
+        out[:, idx] = np.exp2(block) if log else block
+    return cf.__class__(out, index=cf.index, columns=cf.columns)
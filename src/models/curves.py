@@ -0,0 +1,272 @@
+"""Leave-one-out learning and validation curves, stored for post_visualize
+
+Computed naively, every point of a curve is a full leave-one-out evaluation from
+scratch. Here each fold is one task that computes every point of the curve:
+
+    the fold's training set is standardised once, and that matrix is reused by
+        every training size or parameter value
+    training sizes are nested subsets, and parameter values are visited in order,
+        so each fit starts from the last: partial_fit adds only the new samples,
+        and linear warm_start estimators begin from the previous coefficients
+    folds are farmed out to a process pool, with the data sent to each worker once
+
+The returned tables have the columns fold, train_score and test_score, plus
+train_size or the parameter, as src.visualization.post_visualize expects.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+
+import src.data.CleanFrame as cf
+from src.features.build_features import build_sample_matrix, normalize
+from src.models.train_model import get_xy
+from src.parallel import pool_map, shared, spawn_seeds
+
+
+def make_curve_classifier(C=0.1):
+    """L1 penalised logistic regression that can warm start
+
+    make_classifier's liblinear solver always starts from scratch, so curves use
+    saga instead. The data is standardised per fold by the curve functions.
+
+    Inputs
+    ------
+    C: float
+        Inverse penalty strength. Smaller selects fewer proteins.
+
+    Outputs
+    -------
+    estimator: sklearn.linear_model.LogisticRegression
+    """
+    return LogisticRegression(
+        penalty="l1", solver="saga", C=C, max_iter=1000, warm_start=True
+    )
+
+
+def _fold_matrices(fold):
+    """The standardised training and test data of one leave-one-out fold"""
+    X, y = shared["X"], shared["y"]
+    train = np.arange(len(y)) != fold
+    mean = X[train].mean(axis=0)
+    scale = X[train].std(axis=0)
+    scale[scale == 0] = 1
+    return (X[train] - mean) / scale, y[train], (X[[fold]] - mean) / scale, y[fold]
+
+
+def _nested_order(y, rng):
+    """Random order of samples whose every prefix keeps the class proportions"""
+    keys = np.empty(len(y))
+    for label in np.unique(y):
+        members = rng.permutation(np.flatnonzero(y == label))
+        keys[members] = (np.arange(members.size) + rng.uniform()) / members.size
+    return np.argsort(keys, kind="mergesort")
+
+
+def _model(model=None):
+    """The estimator for the next point of a curve
+
+    Only linear models are carried over from the last point: for them warm_start
+    means starting from the previous coefficients. For ensembles it means keeping
+    the fitted trees, so every other estimator is cloned afresh.
+    """
+    estimator = shared["estimator"]
+    if model is not None and _warm_starts(estimator):
+        return model
+    model = clone(estimator)
+    if _warm_starts(model):
+        model.set_params(warm_start=True)
+    return model
+
+
+def _warm_starts(estimator):
+    return estimator.__module__.startswith("sklearn.linear_model") and (
+        "warm_start" in estimator.get_params()
+    )
+
+
+def _point(model, X_train, y_train, X_test, y_test, fit_time):
+    return {
+        "train_score": model.score(X_train, y_train),
+        "test_score": float(model.predict(X_test)[0] == y_test),
+        "fit_time": fit_time,
+    }
+
+
+def _learning_fold(args):
+    """Every point of the learning curve for one fold"""
+    fold, sizes, seed, incremental = args
+    X_train, y_train, X_test, y_test = _fold_matrices(fold)
+    order = _nested_order(y_train, np.random.RandomState(seed))
+    classes = np.unique(shared["y"])
+    model, seen, rows = None, 0, []
+    for size in sizes:
+        start = time.perf_counter()
+        if incremental:
+            # partial_fit always continues, so the model is only created once
+            model = _model() if model is None else model
+            new = order[seen:size]
+            model.partial_fit(X_train[new], y_train[new], classes=classes)
+        else:
+            model = _model(model)
+            model.fit(X_train[order[:size]], y_train[order[:size]])
+        fit_time = time.perf_counter() - start
+        seen = size
+        row = {"fold": fold, "train_size": size}
+        row.update(
+            _point(
+                model,
+                X_train[order[:size]],
+                y_train[order[:size]],
+                X_test,
+                y_test,
+                fit_time,
+            )
+        )
+        rows.append(row)
+    return rows
+
+
+def _validation_fold(args):
+    """Every point of the validation curve for one fold"""
+    fold, param, values = args
+    X_train, y_train, X_test, y_test = _fold_matrices(fold)
+    model, rows = None, []
+    for value in values:
+        start = time.perf_counter()
+        model = _model(model).set_params(**{param: value}).fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+        row = {"fold": fold, param: value}
+        row.update(_point(model, X_train, y_train, X_test, y_test, fit_time))
+        rows.append(row)
+    return rows
+
+
+def _run(func, tasks, X, y, estimator, n_jobs):
+    """Run func over tasks, in a process pool if n_jobs > 1"""
+    results = pool_map(
+        func, tasks, n_jobs=n_jobs, data=dict(X=X, y=y, estimator=estimator)
+    )
+    rows = [row for fold in results for row in fold]
+    return cf.CleanFrame(rows, columns=list(rows[0]))
+
+
+def loo_learning_curve(
+    data,
+    estimator=None,
+    train_sizes=(0.2, 0.4, 0.6, 0.8, 1.0),
+    target="label",
+    incremental=None,
+    n_jobs=1,
+    random_state=None,
+):
+    """Leave-one-out train and test accuracy against the number of training samples
+
+    Within each fold the training sizes are nested subsets, drawn so every prefix
+    keeps the class proportions. partial_fit and linear warm_start estimators
+    continue from the last fit; any other is refit from scratch at each size.
+
+    Inputs
+    ------
+    data: SampleMatrix or CleanFrame
+        Samples x proteins, as returned by build_sample_matrix or prep_umap
+    estimator: sklearn classifier, optional
+        Fit to standardised data. Defaults to make_curve_classifier()
+    train_sizes: list-like
+        Numbers of training samples, or fractions of each fold's training set
+    target: str
+        Column, or SampleMatrix attribute, holding the class labels
+    incremental: bool, optional
+        If true, train with partial_fit on the samples added at each size
+        Defaults to whether the estimator has partial_fit
+    n_jobs: int
+        Number of processes to use
+    random_state: int, optional
+        Seed from which the per-fold sample orders are drawn
+
+    Outputs
+    -------
+    curve: CleanFrame
+        One row per fold and size, with the columns fold, train_size, train_score,
+        test_score and fit_time
+    """
+    if estimator is None:
+        estimator = make_curve_classifier()
+    if incremental is None:
+        incremental = hasattr(estimator, "partial_fit")
+    if not isinstance(incremental, bool):
+        raise ValueError(f"{incremental} must be a bool")
+    X, y, _ = get_xy(data, target=target)
+
+    n_train = len(y) - 1
+    sizes = np.asarray(train_sizes, dtype=np.float64)
+    if np.all(sizes <= 1):
+        sizes = np.round(sizes * n_train)
+    sizes = np.unique(sizes.astype(np.int64))
+    if sizes[0] < np.unique(y).size or sizes[-1] > n_train:
+        raise ValueError(
+            f"train_sizes must be between the number of classes and {n_train}"
+        )
+
+    seeds = spawn_seeds(random_state, len(y))
+    tasks = [(fold, sizes, seeds[fold], incremental) for fold in range(len(y))]
+    return _run(_learning_fold, tasks, X, y, estimator, n_jobs)
+
+
+def loo_validation_curve(
+    data, param="C", values=None, estimator=None, target="label", n_jobs=1
+):
+    """Leave-one-out train and test accuracy against the value of a parameter
+
+    Within each fold the values are fit in the order given, each fit of a linear
+    warm_start estimator starting from the last. For penalties, order them from the
+    strongest, ie. increasing C, so the sparse early solutions seed the later ones.
+
+    Inputs
+    ------
+    data: SampleMatrix or CleanFrame
+        Samples x proteins, as returned by build_sample_matrix or prep_umap
+    param: str
+        Name of the estimator parameter to vary
+    values: list-like, optional
+        Values of param, defaults to 10 log spaced values of C from 0.01 to 10
+    estimator: sklearn classifier, optional
+        Fit to standardised data. Defaults to make_curve_classifier()
+    target: str
+        Column, or SampleMatrix attribute, holding the class labels
+    n_jobs: int
+        Number of processes to use
+
+    Outputs
+    -------
+    curve: CleanFrame
+        One row per fold and value, with the columns fold, param, train_score,
+        test_score and fit_time
+    """
+    if not isinstance(param, str):
+        raise ValueError("param must be a str")
+    if estimator is None:
+        estimator = make_curve_classifier()
+    if param not in estimator.get_params():
+        raise ValueError(f"{param} is not a parameter of the estimator")
+    if values is None:
+        values = np.logspace(-2, 1, 10)
+    X, y, _ = get_xy(data, target=target)
+
+    tasks = [(fold, param, list(values)) for fold in range(len(y))]
+    return _run(_validation_fold, tasks, X, y, estimator, n_jobs)
+
+
+if __name__ == "__main__":
+
+    # Store curves for each region, for post_visualize
+    for region in ("frontal", "cingulate"):
+        full = cf.CleanFrame(pd.read_pickle(f"data/interim/{region}_full.pkl"))
+        matrix = build_sample_matrix(normalize(full))
+        learning = loo_learning_curve(matrix, n_jobs=2, random_state=1)
+        pd.to_pickle(learning, f"models/{region}_learning_curve.pkl")
+        validation = loo_validation_curve(matrix, n_jobs=2)
+        pd.to_pickle(validation, f"models/{region}_validation_curve.pkl")
@@ -0,0 +1,215 @@
+"""Permutation test of leave-one-out classifier accuracy
+
+With 10 samples per class, a LOO accuracy well above chance can still happen by luck.
+Here the labels are shuffled, optionally only within each TMT batch so batch structure
+is preserved, and the LOO accuracy is recomputed many times to build a null
+distribution. The empirical p-value is the fraction of shuffles scoring at least as
+well as the real labels.
+
+Standardisation does not depend on the labels, so each fold's scaling is computed once
+and shared with the workers, which only refit the classifier. Permutations are sent to
+the pool in batches, and testing stops early once the p-value is confidently above or
+below alpha.
+"""
+
+import numpy as np
+from scipy.stats import beta
+from sklearn.base import clone
+
+from src.models.train_model import get_xy, make_classifier
+from src.parallel import init_worker, make_pool, shared, spawn_seeds
+
+
+def _fold_scaling(X):
+    """Mean and scale of the training samples of every leave-one-out fold"""
+    n = X.shape[0]
+    total, total_sq = X.sum(axis=0), (X ** 2).sum(axis=0)
+    means = (total - X) / (n - 1)
+    scales = np.sqrt(np.maximum((total_sq - X ** 2) / (n - 1) - means ** 2, 0))
+    scales[scales == 0] = 1
+    return means, scales
+
+
+def _loo_accuracy(y):
+    """LOO accuracy for one labelling, using the cached fold scaling"""
+    X, (means, scales), estimator = shared["X"], shared["folds"], shared["estimator"]
+    correct = 0
+    for i in range(len(y)):
+        train = np.arange(len(y)) != i
+        Xs = (X - means[i]) / scales[i]
+        model = clone(estimator).fit(Xs[train], y[train])
+        correct += model.predict(Xs[[i]])[0] == y[i]
+    return correct / len(y)
+
+
+def _run_batch(labellings):
+    return [_loo_accuracy(y) for y in labellings]
+
+
+def permute(y, strata=None, random_state=None):
+    """Shuffle labels, optionally only within each stratum
+
+    Inputs
+    ------
+    y: np.ndarray
+        Labels to shuffle
+    strata: np.ndarray, optional
+        Group of each sample, ie. its batch. Labels only move within a group.
+    random_state: int or np.random.RandomState, optional
+
+    Outputs
+    -------
+    y_perm: np.ndarray
+    """
+    rng = np.random.RandomState(random_state)
+    if strata is None:
+        return rng.permutation(y)
+    y_perm = y.copy()
+    for group in np.unique(strata):
+        members = np.flatnonzero(strata == group)
+        y_perm[members] = y[rng.permutation(members)]
+    return y_perm
+
+
+def p_value_interval(k, m, confidence=0.99):
+    """Clopper-Pearson interval for a p-value estimated from k of m permutations"""
+    tail = (1 - confidence) / 2
+    lower = beta.ppf(tail, k, m - k + 1) if k > 0 else 0.0
+    upper = beta.ppf(1 - tail, k + 1, m - k) if k < m else 1.0
+    return lower, upper
+
+
+def _checker(score, n_permutations, alpha, early_stop, confidence, verbose):
+    """A list collecting the permutation scores, and a function that records a
+    batch's results into it, returning True if testing can stop
+    """
+    scores = []
+
+    def check(results):
+        scores.extend(results)
+        k, m = sum(s >= score for s in scores), len(scores)
+        p_value = (1 + k) / (1 + m)
+        lower, upper = p_value_interval(k, m, confidence)
+        if verbose:
+            print(f"{m}/{n_permutations} permutations, p = {p_value:.4f}")
+        return early_stop and (upper < alpha or lower > alpha)
+
+    return scores, check
+
+
+def _serial_batches(batches, check):
+    """Run batches in this process, in order, until check says stop"""
+    for labellings in batches:
+        if check(_run_batch(labellings)):
+            break
+
+
+def _pool_batches(batches, check, n_jobs, data):
+    """Run batches in a pool of n_jobs workers until check says stop
+
+    n_jobs batches are kept in flight and their results consumed in submission
+    order, so stopping happens at the same batch as _serial_batches.
+    """
+    with make_pool(n_jobs, data) as pool:
+        pending = [pool.submit(_run_batch, b) for b in batches[:n_jobs]]
+        queued = iter(batches[n_jobs:])
+        while pending:
+            if check(pending.pop(0).result()):
+                for future in pending:
+                    future.cancel()
+                break
+            following = next(queued, None)
+            if following is not None:
+                pending.append(pool.submit(_run_batch, following))
+
+
+def permutation_test(
+    data,
+    estimator=None,
+    target="label",
+    strata="batch",
+    n_permutations=500,
+    batch_size=20,
+    n_jobs=1,
+    alpha=0.05,
+    early_stop=True,
+    confidence=0.99,
+    random_state=None,
+    verbose=True,
+):
+    """Empirical p-value for the LOO accuracy of a classifier
+
+    Inputs
+    ------
+    data: SampleMatrix or CleanFrame
+        Samples x proteins, as returned by build_sample_matrix or prep_umap
+    estimator: sklearn classifier, optional
+        Fit to standardised data. Defaults to the classifier of make_classifier()
+    target: str
+        Column, or SampleMatrix attribute, holding the class labels
+    strata: str, optional
+        Column, or SampleMatrix attribute, to shuffle within. None shuffles globally.
+    n_permutations: int
+        Maximum number of shuffles
+    batch_size: int
+        Number of shuffles sent to a worker at once
+    n_jobs: int
+        Number of processes to use
+    alpha: float
+        Significance threshold used for early stopping
+    early_stop: bool
+        If true, stop once the confidence interval of the p-value excludes alpha
+    confidence: float
+        Confidence level of that interval
+    random_state: int, optional
+        Seed from which each shuffle's seed is drawn. Stopping is checked after
+        every batch in order, so results do not depend on n_jobs.
+    verbose: bool
+        If true, print progress after every batch
+
+    Outputs
+    -------
+    score: float
+        LOO accuracy with the true labels
+    permutation_scores: np.ndarray
+        LOO accuracy of each shuffle performed
+    p_value: float
+        (1 + shuffles scoring >= score) / (1 + shuffles)
+    """
+    # Type check inputs
+    for var in (n_permutations, batch_size, n_jobs):
+        if not isinstance(var, int) or var < 1:
+            raise ValueError(f"{var} must be a positive int")
+    for i in (early_stop, verbose):
+        if not isinstance(i, bool):
+            raise ValueError(f"{i} must be a bool")
+    if not 0 < alpha < 1:
+        raise ValueError("alpha must be between 0 and 1")
+
+    if estimator is None:
+        estimator = make_classifier().steps[-1][1]
+    X, y, _ = get_xy(data, target=target)
+    groups = None if strata is None else get_xy(data, target=strata)[1]
+    folds = _fold_scaling(X)
+
+    seeds = spawn_seeds(random_state, n_permutations)
+    batches = [
+        [permute(y, groups, seed) for seed in seeds[i : i + batch_size]]
+        for i in range(0, n_permutations, batch_size)
+    ]
+
+    data = dict(X=X, folds=folds, estimator=estimator)
+    init_worker(data)
+    score = _loo_accuracy(y)
+    scores, check = _checker(
+        score, n_permutations, alpha, early_stop, confidence, verbose
+    )
+    if n_jobs > 1:
+        _pool_batches(batches, check, n_jobs, data)
+    else:
+        _serial_batches(batches, check)
+    shared.clear()
+
+    scores = np.asarray(scores)
+    p_value = (1 + (scores >= score).sum()) / (1 + scores.size)
+    return score, scores, p_value
@@ -0,0 +1,105 @@
+"""Stability selection for ranking candidate biomarkers
+
+An L1 penalised logistic regression is fit to many random half-samples of the data,
+and each protein is scored by how often it receives a non-zero coefficient
+(Meinshausen & Buhlmann, 2010). With 40 samples a single sparse fit is very sensitive
+to which samples it sees; the selection frequency is far more stable.
+
+Resamples are farmed out to a process pool in chunks. The data is sent to each worker
+once, when it starts, and every resample has its own seed drawn up front, so results
+are identical whatever the number of processes.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.preprocessing import StandardScaler
+
+import src.data.CleanFrame as cf
+from src.models.train_model import get_xy
+from src.parallel import pool_map, shared, spawn_seeds
+
+
+def _subsample(y, fraction, rng):
+    """Indices of a random subsample, drawn within each class so none are lost"""
+    index = []
+    for label in np.unique(y):
+        members = np.flatnonzero(y == label)
+        size = max(1, int(round(fraction * members.size)))
+        index.append(rng.choice(members, size=size, replace=False))
+    return np.sort(np.concatenate(index))
+
+
+def _count_selected(args):
+    """Fit one sparse model per seed, returning how often each protein was selected"""
+    seeds, C, fraction = args
+    X, y = shared["X"], shared["y"]
+    counts = np.zeros(X.shape[1], dtype=np.int64)
+    for seed in seeds:
+        index = _subsample(y, fraction, np.random.RandomState(seed))
+        X_sub = StandardScaler().fit_transform(X[index])
+        model = OneVsRestClassifier(
+            LogisticRegression(penalty="l1", solver="liblinear", C=C)
+        ).fit(X_sub, y[index])
+        coef = np.vstack([est.coef_ for est in model.estimators_])
+        counts += (coef != 0).any(axis=0)
+    return counts
+
+
+def stability_selection(
+    data,
+    C=0.1,
+    n_resamples=200,
+    sample_fraction=0.5,
+    target="label",
+    n_jobs=1,
+    chunk_size=10,
+    random_state=None,
+):
+    """Score each protein by how often a sparse classifier selects it
+
+    Inputs
+    ------
+    data: SampleMatrix or CleanFrame
+        Samples x proteins, as returned by build_sample_matrix or prep_umap
+    C: float
+        Inverse L1 penalty strength for LogisticRegression. Smaller selects fewer.
+    n_resamples: int
+        Number of subsamples to fit
+    sample_fraction: float
+        Fraction of each class drawn, without replacement, per subsample
+    target: str
+        Column, or SampleMatrix attribute, holding the class labels
+    n_jobs: int
+        Number of processes to use
+    chunk_size: int
+        Number of resamples sent to a worker at once
+    random_state: int, optional
+        Seed from which the per-resample seeds are drawn
+
+    Outputs
+    -------
+    freqs: CleanFrame
+        Indexed by protein, with the column selection_freq, ready to be joined
+        onto the output of prep_volcano
+    """
+    # Type check inputs
+    for var in (n_resamples, n_jobs, chunk_size):
+        if not isinstance(var, int) or var < 1:
+            raise ValueError(f"{var} must be a positive int")
+    if not 0 < sample_fraction <= 1:
+        raise ValueError("sample_fraction must be in (0, 1]")
+
+    X, y, proteins = get_xy(data, target=target)
+    seeds = spawn_seeds(random_state, n_resamples)
+    tasks = [
+        (seeds[i : i + chunk_size], C, sample_fraction)
+        for i in range(0, n_resamples, chunk_size)
+    ]
+
+    counts = sum(pool_map(_count_selected, tasks, n_jobs=n_jobs, data=dict(X=X, y=y)))
+
+    return cf.CleanFrame(
+        {"selection_freq": counts / n_resamples}, index=pd.Index(proteins)
+    )
@@ -0,0 +1,390 @@
+"""Functions for training classifiers on the sample matrix
+
+Models are trained on samples x proteins data, either a SampleMatrix from
+src.features.build_features or a CleanFrame in the layout returned by prep_umap.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression, enet_path
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+import src.data.CleanFrame as cf
+from src.features.build_features import SampleMatrix, build_sample_matrix, normalize
+
+META_COLS = ("batch", "label")
+
+
+def get_xy(data, target="label"):
+    """Split sample data into a feature array, targets and feature names
+
+    Inputs
+    ------
+    data: SampleMatrix or CleanFrame
+        If a CleanFrame, it must be laid out as returned by prep_umap
+    target: str
+        Name of the column, or SampleMatrix attribute, to use as targets
+
+    Outputs
+    -------
+    X: np.ndarray
+        float64 array of shape (n_samples, n_proteins)
+    y: np.ndarray
+        Targets, of length n_samples
+    proteins: pd.Index
+        Feature names, in the order of the columns of X
+    """
+    if not isinstance(target, str):
+        raise ValueError("target must be a str")
+    if isinstance(data, SampleMatrix):
+        return data.X, np.asarray(getattr(data, target)), data.proteins
+    proteins = data.columns.drop([i for i in META_COLS if i in data.columns])
+    X = np.ascontiguousarray(data[proteins].to_numpy(dtype=np.float64))
+    return X, np.asarray(data[target]), proteins
+
+
+def _sigmoid(eta):
+    return 1 / (1 + np.exp(-np.clip(eta, -30, 30)))
+
+
+def _solve_subset(X, y, beta, b0, subset, lam, l1_ratio, tol, max_iter):
+    """Penalised logistic regression on the columns in subset, by IRLS, starting
+    from (beta, b0). beta is updated in place.
+
+    Each IRLS step is a weighted elastic net. Its rows are centred on their weighted
+    means and scaled by the square root of their weights, so it can be solved,
+    warm started, by sklearn's compiled coordinate descent.
+    """
+    Xs = X[:, subset]
+    for _ in range(max_iter):
+        eta = b0 + Xs @ beta[subset]
+        p = _sigmoid(eta)
+        w = np.maximum(p * (1 - p), 1e-5)
+        z = eta + (y - p) / w
+        x_mean, z_mean = w @ Xs / w.sum(), w @ z / w.sum()
+        root_w = np.sqrt(w)
+        Xw = np.asfortranarray(root_w[:, None] * (Xs - x_mean))
+        _, coefs, _ = enet_path(
+            Xw,
+            root_w * (z - z_mean),
+            l1_ratio=l1_ratio,
+            alphas=[lam],
+            coef_init=beta[subset],
+            precompute=False,
+            check_input=False,
+            tol=tol * 1e-2,
+            max_iter=10000,
+        )
+        new, new_b0 = coefs[:, 0], z_mean - x_mean @ coefs[:, 0]
+        change = max(np.abs(new - beta[subset]).max(initial=0), abs(new_b0 - b0))
+        beta[subset], b0 = new, new_b0
+        if change < tol:
+            break
+    return b0
+
+
+def _binary_path(X, y, alphas, l1_ratio, tol, max_iter):
+    """Warm started path for one binary problem, X already standardised
+
+    Before each fit the sequential strong rule (Tibshirani et al., 2012) discards the
+    proteins that should stay at zero, and the fit is only run on the rest. The
+    full gradient is then checked for KKT violations, which are added back and refit.
+    """
+    n, p = X.shape
+    beta = np.zeros(p)
+    ybar = np.clip(y.mean(), 1e-5, 1 - 1e-5)
+    b0 = np.log(ybar / (1 - ybar))
+    grad = X.T @ (y - ybar) / n
+    coefs = np.zeros((len(alphas), p))
+    intercepts = np.zeros(len(alphas))
+
+    prev = alphas[0]
+    for i, lam in enumerate(alphas):
+        strong = np.abs(grad) >= l1_ratio * (2 * lam - prev)
+        subset = np.flatnonzero(strong | (beta != 0))
+        while True:
+            b0 = _solve_subset(X, y, beta, b0, subset, lam, l1_ratio, tol, max_iter)
+            grad = X.T @ (y - _sigmoid(b0 + X @ beta)) / n
+            # Ridge part of the gradient is zero for proteins outside the model
+            violations = np.abs(grad) > l1_ratio * lam * (1 + 1e-6)
+            violations[subset] = False
+            if not violations.any():
+                break
+            subset = np.union1d(subset, np.flatnonzero(violations))
+        coefs[i], intercepts[i] = beta, b0
+        prev = lam
+    return coefs, intercepts
+
+
+class LogisticPath:
+    """Elastic net logistic regression fit along a path of penalties
+
+    The path runs from the strongest penalty, where no protein is selected, to the
+    weakest. Each fit is warm started from the previous solution and only considers
+    the proteins that can enter the model, and every fit is solved by sklearn's
+    compiled coordinate descent. Multi-class problems are fit one-vs-rest.
+
+    The penalty for coefficients beta is
+        alpha * (l1_ratio * |beta|_1 + (1 - l1_ratio) / 2 * |beta|_2 ** 2)
+    applied to standardised proteins, added to the mean log loss.
+
+    Attributes
+    ----------
+    alphas_: np.ndarray
+        Penalties, in decreasing order
+    classes_: np.ndarray
+        Class labels
+    coef_: np.ndarray
+        (n_alphas, n_classes, n_proteins) coefficients on the standardised scale
+    intercept_: np.ndarray
+        (n_alphas, n_classes) intercepts
+    """
+
+    def __init__(
+        self, n_alphas=100, alphas=None, eps=1e-2, l1_ratio=1.0, tol=1e-4, max_iter=100
+    ):
+        """
+        Inputs
+        ------
+        n_alphas: int
+            Number of penalties on the path, if alphas is not given
+        alphas: array-like, optional
+            Penalties to use. Sorted into decreasing order.
+        eps: float
+            Ratio of the weakest to the strongest penalty, if alphas is not given
+        l1_ratio: float
+            Mix of L1 to L2 penalty. 1 is the lasso. Must be > 0.
+        tol: float
+            Coordinate descent stops once no coefficient changes by more than this
+        max_iter: int
+            Maximum number of IRLS, and coordinate descent, iterations per fit
+        """
+        if not 0 < l1_ratio <= 1:
+            raise ValueError("l1_ratio must be in (0, 1]")
+        for var in (n_alphas, max_iter):
+            if not isinstance(var, int) or var < 1:
+                raise ValueError(f"{var} must be a positive int")
+        self.n_alphas = n_alphas
+        self.alphas = alphas
+        self.eps = eps
+        self.l1_ratio = l1_ratio
+        self.tol = tol
+        self.max_iter = max_iter
+
+    def _targets(self, y):
+        return [(y == label).astype(np.float64) for label in self.classes_]
+
+    def fit(self, X, y):
+        """Fit the path
+
+        Inputs
+        ------
+        X: np.ndarray
+            (n_samples, n_proteins) features
+        y: array-like
+            Class labels
+
+        Outputs
+        -------
+        self: LogisticPath
+        """
+        y = np.asarray(y)
+        self.classes_ = np.unique(y)
+        if self.classes_.size < 2:
+            raise ValueError("y must contain at least two classes")
+        self.mean_ = X.mean(axis=0)
+        self.scale_ = X.std(axis=0)
+        self.scale_[self.scale_ == 0] = 1
+        Xs = (X - self.mean_) / self.scale_
+        # A binary problem is fit once, for the second class
+        targets = self._targets(y)
+        if self.classes_.size == 2:
+            targets = targets[1:]
+
+        n = Xs.shape[0]
+        alpha_max = max(
+            np.abs(Xs.T @ (t - t.mean())).max() / (n * self.l1_ratio) for t in targets
+        )
+        if self.alphas is None:
+            self.alphas_ = np.logspace(
+                np.log10(alpha_max), np.log10(alpha_max * self.eps), self.n_alphas
+            )
+        else:
+            self.alphas_ = np.sort(np.asarray(self.alphas, dtype=np.float64))[::-1]
+        # Solving far down the path from a cold start is slow, so work down to the
+        # first penalty from alpha_max, discarding those warm up solutions
+        warm_up = np.logspace(np.log10(alpha_max), np.log10(self.alphas_[0]), 10)
+        warm_up = warm_up[:-1] if self.alphas_[0] < alpha_max else warm_up[:0]
+        grid = np.concatenate([warm_up, self.alphas_])
+
+        paths = [
+            _binary_path(Xs, t, grid, self.l1_ratio, self.tol, self.max_iter)
+            for t in targets
+        ]
+        self.coef_ = np.stack([path[0][warm_up.size :] for path in paths], axis=1)
+        self.intercept_ = np.stack(
+            [path[1][warm_up.size :] for path in paths], axis=1
+        )
+        return self
+
+    def decision_function(self, X):
+        """(n_alphas, n_samples, n_classes) decision values along the path
+
+        For binary problems the last axis has length 1, for the second class
+        """
+        Xs = (X - self.mean_) / self.scale_
+        return np.einsum("sp,acp->asc", Xs, self.coef_) + self.intercept_[:, None, :]
+
+    def predict(self, X):
+        """(n_alphas, n_samples) predicted labels along the path"""
+        scores = self.decision_function(X)
+        if self.classes_.size == 2:
+            return self.classes_[(scores[..., 0] > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=-1)]
+
+    def n_selected(self):
+        """Number of proteins with a non-zero coefficient, for each penalty"""
+        return (self.coef_ != 0).any(axis=1).sum(axis=1)
+
+
+def loo_path_scores(data, target="label", **kwargs):
+    """Leave-one-out accuracy along a regularisation path
+
+    The penalties are fixed from a fit to all the data, then a LogisticPath is fit
+    for each left out sample, so every fold is scored on the same penalties.
+
+    Inputs
+    ------
+    data: SampleMatrix or CleanFrame
+        Samples x proteins, as returned by build_sample_matrix or prep_umap
+    target: str
+        Column, or SampleMatrix attribute, holding the class labels
+    kwargs:
+        Additional parameters passed to LogisticPath
+
+    Outputs
+    -------
+    scores: CleanFrame
+        Indexed by alpha, in decreasing order, with the columns accuracy and
+        n_selected, the number of proteins selected in the full fit
+    """
+    X, y, _ = get_xy(data, target=target)
+    full = LogisticPath(**kwargs).fit(X, y)
+    kwargs["alphas"] = full.alphas_
+
+    correct = np.zeros(full.alphas_.size)
+    for i in range(len(y)):
+        train = np.arange(len(y)) != i
+        path = LogisticPath(**kwargs).fit(X[train], y[train])
+        correct += path.predict(X[[i]])[:, 0] == y[i]
+
+    return cf.CleanFrame(
+        {"accuracy": correct / len(y), "n_selected": full.n_selected()},
+        index=pd.Index(full.alphas_, name="alpha"),
+    )
+
+
+def make_classifier(C=0.1):
+    """Standardised, L1 penalised one-vs-rest logistic regression
+
+    Inputs
+    ------
+    C: float
+        Inverse penalty strength. Smaller selects fewer proteins.
+
+    Outputs
+    -------
+    estimator: sklearn.pipeline.Pipeline
+    """
+    return make_pipeline(
+        StandardScaler(),
+        OneVsRestClassifier(LogisticRegression(penalty="l1", solver="liblinear", C=C)),
+    )
+
+
+def _scores(estimator, X):
+    """Class scores, as probabilities where the estimator supports it"""
+    if hasattr(estimator, "predict_proba"):
+        return estimator.predict_proba(X)
+    scores = estimator.decision_function(X)
+    return scores[:, None] if scores.ndim == 1 else scores
+
+
+def loo_predict(data, estimator=None, target="label"):
+    """Leave-one-out predictions, scores and fit metadata for every sample
+
+    Training happens once, here. The returned table holds everything
+    src.visualization.post_visualize needs to draw evaluation figures without
+    refitting.
+
+    Inputs
+    ------
+    data: SampleMatrix or CleanFrame
+        Samples x proteins, as returned by build_sample_matrix or prep_umap
+    estimator: sklearn estimator, optional
+        Cloned for each fold. Defaults to make_classifier()
+    target: str
+        Column, or SampleMatrix attribute, holding the class labels
+
+    Outputs
+    -------
+    preds: CleanFrame
+        One row per fold, with the columns
+            fold, sample, true, pred: the left out sample and its prediction
+                sample is taken from the index of a CleanFrame
+            score_<class>: the estimator's score for each class
+            fit_time, train_size, estimator: fit metadata
+    """
+    if estimator is None:
+        estimator = make_classifier()
+    X, y, _ = get_xy(data, target=target)
+    samples = getattr(data, "samples", None)
+    if samples is None:
+        samples = data.index
+    classes = np.unique(y)
+
+    rows = []
+    for i in range(len(y)):
+        train = np.arange(len(y)) != i
+        model = clone(estimator)
+        start = time.perf_counter()
+        model.fit(X[train], y[train])
+        fit_time = time.perf_counter() - start
+
+        scores = np.full(classes.size, np.nan)
+        fitted = _scores(model, X[[i]])[0]
+        if fitted.size == 1:
+            # Binary decision_function scores the second class, and its negation
+            # the first, so every score column can be drawn
+            scores[np.searchsorted(classes, model.classes_)] = [-fitted[0], fitted[0]]
+        else:
+            scores[np.searchsorted(classes, model.classes_)] = fitted
+        row = {
+            "fold": i,
+            "sample": samples[i],
+            "true": y[i],
+            "pred": model.predict(X[[i]])[0],
+        }
+        row.update({f"score_{label}": score for label, score in zip(classes, scores)})
+        row.update(
+            {"fit_time": fit_time, "train_size": train.sum(), "estimator": repr(model)}
+        )
+        rows.append(row)
+
+    return cf.CleanFrame(rows, columns=list(rows[0]))
+
+
+if __name__ == "__main__":
+
+    # Train on each region once, storing predictions for post_visualize
+    for region in ("frontal", "cingulate"):
+        full = cf.CleanFrame(pd.read_pickle(f"data/interim/{region}_full.pkl"))
+        matrix = build_sample_matrix(normalize(full))
+        preds = loo_predict(matrix)
+        pd.to_pickle(preds, f"models/{region}_loo_predictions.pkl")
+        print(f"{region}: LOO accuracy {(preds['true'] == preds['pred']).mean():.2f}")
@@ -0,0 +1,64 @@
+"""Helpers shared by the functions that farm work out to a process pool
+
+Read-only data, such as the sample matrix, is sent to each worker once, when it
+starts, rather than with every task: init_worker places it in the module level shared
+dict, where the task functions look it up. Every task gets its own seed, drawn up front
+by spawn_seeds, so results are identical whatever the number of processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Read-only data shared with each worker process by init_worker
+shared: dict = {}
+
+
+def init_worker(data):
+    """Replace the contents of shared with the dict data"""
+    shared.clear()
+    shared.update(data)
+
+
+def spawn_seeds(random_state, size):
+    """size int32 seeds, one per task, drawn from random_state"""
+    return np.random.RandomState(random_state).randint(
+        np.iinfo(np.int32).max, size=size
+    )
+
+
+def make_pool(n_jobs, data):
+    """A process pool of n_jobs workers, each starting with data in shared"""
+    return ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=init_worker, initargs=(data,)
+    )
+
+
+def pool_map(func, tasks, n_jobs=1, data=None):
+    """func applied to every task, results in order
+
+    Inputs
+    ------
+    func: callable
+        Module level function taking one task, so it can be sent to a worker
+    tasks: list-like
+    n_jobs: int
+        Number of processes to use. With 1, tasks are run in this process.
+    data: dict, optional
+        Placed in shared for the duration, in every worker or in this process
+
+    Outputs
+    -------
+    results: list
+    """
+    if not isinstance(n_jobs, int) or n_jobs < 1:
+        raise ValueError(f"{n_jobs} must be a positive int")
+    data = {} if data is None else data
+    if n_jobs > 1:
+        with make_pool(n_jobs, data) as pool:
+            return list(pool.map(func, tasks))
+    init_worker(data)
+    try:
+        return [func(task) for task in tasks]
+    finally:
+        shared.clear()
@@ -0,0 +1,281 @@
+"""Command line runner for the whole analysis
+
+The stages below are declared as a DAG and run for each brain region:
+
+    load -> clean -> normalize -> prep -> plot
+                                      \\-> train
+
+Regions are independent, so with --jobs > 1 one region can be normalising while
+another is still loading. Every stage reads its inputs from, and writes its outputs
+to, data/interim (or models/ and reports/figures/, set by --interim, --models and
+--figures), so any stage can be rerun or resumed from without repeating the ones
+before it.
+
+Usage
+-----
+    python -m src.pipeline --jobs 2
+    python -m src.pipeline --from normalize --regions frontal
+    python -m src.pipeline --stages plot
+"""
+
+import argparse
+import glob
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import pandas as pd  # noqa: E402
+
+import src.data.CleanFrame as cf  # noqa: E402
+from src.data.make_dataset import NAMES, USECOLS, make_data  # noqa: E402
+from src.features.build_features import build_sample_matrix, normalize  # noqa: E402
+from src.features.impute import impute  # noqa: E402
+from src.models.train_model import loo_predict  # noqa: E402
+from src.visualization.pre_visualize import plot_umaps, plot_volcanos  # noqa: E402
+from src.visualization.pre_visualize import prep_volcano  # noqa: E402
+
+# Glob, relative to the raw data directory, matching each region's batch files
+REGIONS = OrderedDict([("frontal", "f*"), ("cingulate", "c*")])
+
+
+def _path(opts, region, name):
+    return os.path.join(opts["interim"], f"{region}_{name}.pkl")
+
+
+def _read(opts, region, name):
+    return cf.CleanFrame(pd.read_pickle(_path(opts, region, name)))
+
+
+def load(region, opts):
+    """Read and concatenate a region's batch files, keeping missing values"""
+    files = os.path.join(opts["raw"], REGIONS[region])
+    data = make_data(
+        files,
+        usecols=USECOLS,
+        names=NAMES,
+        index_col=1,
+        axis=1,
+        join="outer",
+        keys=list(range(1, len(glob.glob(files)) + 1)),
+        dropna=False,
+    )
+    pd.to_pickle(data, _path(opts, region, "raw"))
+
+
+def clean(region, opts):
+    """Impute missing values, or drop proteins with any, as make_dataset does
+
+    The intensities are still raw here, so they are imputed on the log2 scale
+    """
+    data = _read(opts, region, "raw")
+    if opts["impute"] == "none":
+        data = data.dropna(axis=0)
+    else:
+        data = impute(data, method=opts["impute"], random_state=1, log=True)
+    pd.to_pickle(data, _path(opts, region, "full"))
+
+
+def normalize_stage(region, opts):
+    """Normalize the TMT channels within each batch"""
+    method = None if opts["normalize"] == "none" else opts["normalize"]
+    data = normalize(_read(opts, region, "full"), method=method)
+    pd.to_pickle(data, _path(opts, region, "norm"))
+
+
+def prep(region, opts):
+    """Build the volcano and UMAP inputs"""
+    pd.to_pickle(prep_volcano(_read(opts, region, "full")), _path(opts, region, "volc"))
+    umap = build_sample_matrix(_read(opts, region, "norm")).to_frame()
+    pd.to_pickle(umap, _path(opts, region, "umap"))
+
+
+def plot(region, opts):
+    """Save the volcano and UMAP figures"""
+    name = region.capitalize()
+    plot_volcanos(_read(opts, region, "volc"), name, fig_dir=opts["figures"])
+    plot_umaps(_read(opts, region, "umap"), name, fig_dir=opts["figures"])
+
+
+def train(region, opts):
+    """Store leave-one-out predictions for post_visualize"""
+    preds = loo_predict(_read(opts, region, "umap"))
+    pd.to_pickle(preds, os.path.join(opts["models"], f"{region}_loo_predictions.pkl"))
+
+
+# Stage name: (function, stages it depends on), in an order that respects the DAG
+STAGES = OrderedDict(
+    [
+        ("load", (load, [])),
+        ("clean", (clean, ["load"])),
+        ("normalize", (normalize_stage, ["clean"])),
+        ("prep", (prep, ["clean", "normalize"])),
+        ("plot", (plot, ["prep"])),
+        ("train", (train, ["prep"])),
+    ]
+)
+
+
+def downstream(stage):
+    """stage and every stage that depends on it, directly or not"""
+    found = {stage}
+    for name, (_, deps) in STAGES.items():
+        if found.intersection(deps):
+            found.add(name)
+    return found
+
+
+def _run_task(task):
+    """Run one (region, stage), returning how long it took"""
+    region, stage, opts = task
+    start = time.perf_counter()
+    STAGES[stage][0](region, opts)
+    return time.perf_counter() - start
+
+
+def _check_names(names, known, kind):
+    for name in names:
+        if name not in known:
+            raise ValueError(f"{name} is not a known {kind}")
+
+
+def _finish(timings, task, elapsed):
+    """Record and report how long a (region, stage) took"""
+    timings[task] = elapsed
+    print(f"[{task[0]}] {task[1]} finished in {elapsed:.2f}s", flush=True)
+
+
+def _run_pool(pending, opts, jobs, timings):
+    """Run the pending tasks in a process pool, each once its dependencies finish
+
+    Inputs
+    ------
+    pending: OrderedDict
+        (region, stage) tasks, each with the set of tasks it must wait for
+    opts: dict
+        Paths and options shared by every stage
+    jobs: int
+        Number of stages to run at once
+    timings: dict
+        Filled with the seconds taken by each task
+    """
+    pending, running = OrderedDict(pending), {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for task, deps in list(pending.items()):
+                if deps.issubset(timings):
+                    running[pool.submit(_run_task, task + (opts,))] = task
+                    del pending[task]
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                _finish(timings, running.pop(future), future.result())
+
+
+def run(regions, stages, opts, jobs=1):
+    """Run the selected stages for each region, respecting the DAG
+
+    Stages that are not selected are assumed to have already written their outputs.
+
+    Inputs
+    ------
+    regions: list-like
+        Regions to run, keys of REGIONS
+    stages: list-like
+        Stages to run, keys of STAGES
+    opts: dict
+        Paths and options shared by every stage
+    jobs: int
+        Number of stages to run at once
+
+    Outputs
+    -------
+    timings: pd.DataFrame
+        Seconds taken by each stage, with regions as columns
+    """
+    if not isinstance(jobs, int) or jobs < 1:
+        raise ValueError("jobs must be a positive int")
+    _check_names(regions, REGIONS, "region")
+    _check_names(stages, STAGES, "stage")
+
+    # Tasks in DAG order, each with the selected tasks it must wait for
+    pending = OrderedDict(
+        (
+            (region, stage),
+            {(region, dep) for dep in STAGES[stage][1] if dep in stages},
+        )
+        for region in regions
+        for stage in STAGES
+        if stage in stages
+    )
+    timings = {}
+    if jobs == 1:
+        for task in pending:
+            _finish(timings, task, _run_task(task + (opts,)))
+    else:
+        _run_pool(pending, opts, jobs, timings)
+
+    return (
+        pd.Series(timings)
+        .unstack(level=0)
+        .reindex(index=[i for i in STAGES if i in stages], columns=list(regions))
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the proteomics analysis pipeline",
+        prog="python -m src.pipeline",
+    )
+    parser.add_argument(
+        "--regions", nargs="+", default=list(REGIONS), choices=list(REGIONS)
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        default=list(STAGES),
+        choices=list(STAGES),
+        help="Only run these stages",
+    )
+    parser.add_argument(
+        "--from",
+        dest="start",
+        choices=list(STAGES),
+        help="Resume from this stage, running it and every stage after it",
+    )
+    parser.add_argument("--jobs", type=int, default=1, help="Stages to run at once")
+    parser.add_argument("--impute", default="none", choices=["none", "minprob", "knn"])
+    parser.add_argument(
+        "--normalize", default="median", choices=["median", "quantile", "none"]
+    )
+    parser.add_argument("--raw", default="data/raw")
+    parser.add_argument("--interim", default="data/interim")
+    parser.add_argument("--models", default="models")
+    parser.add_argument("--figures", default="reports/figures")
+    args = parser.parse_args(argv)
+
+    stages = [i for i in STAGES if i in args.stages]
+    if args.start is not None:
+        stages = [i for i in stages if i in downstream(args.start)]
+    opts = {
+        "raw": args.raw,
+        "interim": args.interim,
+        "models": args.models,
+        "figures": args.figures,
+        "impute": args.impute,
+        "normalize": args.normalize,
+    }
+    for path in (args.interim, args.models, args.figures):
+        os.makedirs(path, exist_ok=True)
+
+    start = time.perf_counter()
+    timings = run(args.regions, stages, opts, jobs=args.jobs)
+    print(timings.round(2).to_string())
+    print(f"Total wall time {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""A script for visualising model performance after training
+
+Every figure here is drawn from tables persisted by training, never by refitting:
+
+    predictions, from src.models.train_model.loo_predict
+        confusion matrix, ROC-AUC and precision-recall curves
+    curves, with the columns fold, train_score and test_score, plus the varied
+        train_size or parameter column
+        learning and validation curves
+
+So regenerating or restyling a figure takes seconds.
+"""
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+from sklearn.metrics import auc, average_precision_score, precision_recall_curve
+from sklearn.metrics import roc_curve
+
+
+def _finish(title, title_size, show, save, path):
+    """Shared plot settings, then show and/or save"""
+    sns.despine(offset=5, trim=False)
+    plt.title(title, fontdict={"fontsize": title_size}, pad=15)
+    if save:
+        plt.savefig(path, dpi=600)
+    if show:
+        plt.show()
+
+
+def _check(title, path, show, save, title_size, label_size):
+    """Type check the inputs shared by every plot"""
+    for i in (title, path):
+        if not isinstance(i, str):
+            raise ValueError(f"{i} must be a str")
+    for i in (show, save):
+        if not isinstance(i, bool):
+            raise ValueError(f"{i} must be a bool")
+    for var in (title_size, label_size):
+        try:
+            float(var)
+        except (ValueError, TypeError):
+            print(f"{var} needs to be numeric")
+            raise
+
+
+def get_scores(preds):
+    """Split a predictions table into class labels, truths and a score matrix
+
+    Inputs
+    ------
+    preds: CleanFrame
+        As returned by loo_predict
+
+    Outputs
+    -------
+    classes: list
+        Class labels, in the order of the columns of scores
+    truth: np.ndarray
+        True label of each fold
+    scores: np.ndarray
+        (n_folds, n_classes) scores
+    """
+    columns = [i for i in preds.columns if str(i).startswith("score_")]
+    if not columns:
+        raise ValueError("preds has no score_ columns")
+    classes = [i[len("score_") :] for i in columns]
+    return classes, preds["true"].astype(str).to_numpy(), preds[columns].to_numpy()
+
+
+def confusion_matrix(
+    preds,
+    normalize=False,
+    title="Confusion Matrix",
+    title_size=12,
+    label_size=8,
+    show=True,
+    save=False,
+    path="reports/figures/confusion_matrix.png",
+):
+    """Plots the confusion matrix of stored predictions
+
+    Inputs
+    ------
+    preds: CleanFrame
+        As returned by loo_predict
+    normalize: bool, Optional
+        If true, show the fraction of each true class rather than counts
+    title: str, Optional
+        Plot title
+    title_size: numeric, Optional
+        Font size, in pts, to use for Figure title
+    label_size: numeric, Optional
+        Font size, in pts, to use for axes title
+    show: bool, Optional
+        If true, display the plot
+    save: bool, Optional
+        If true, save the plot
+    path: str, Optional
+        Where to save the plot, if save == True
+
+    Outputs
+    -------
+    matrix: pd.DataFrame
+        Counts, or fractions, with true labels as rows
+    """
+    _check(title, path, show, save, title_size, label_size)
+    if not isinstance(normalize, bool):
+        raise ValueError(f"{normalize} must be a bool")
+
+    matrix = pd.crosstab(
+        preds["true"], preds["pred"], rownames=["True"], colnames=["Predicted"]
+    )
+    labels = matrix.index.union(matrix.columns)
+    matrix = matrix.reindex(index=labels, columns=labels, fill_value=0)
+    if normalize:
+        matrix = matrix.div(matrix.sum(axis=1), axis=0)
+
+    sns.heatmap(
+        matrix,
+        annot=True,
+        fmt=".2f" if normalize else "d",
+        cmap="Blues",
+        cbar=False,
+        square=True,
+        annot_kws={"fontsize": label_size},
+    )
+    plt.xlabel("Predicted", fontdict={"fontsize": label_size}, labelpad=5)
+    plt.ylabel("True", fontdict={"fontsize": label_size}, labelpad=10)
+    plt.tick_params(axis="both", labelsize=label_size)
+    _finish(title, title_size, show, save, path)
+    return matrix
+
+
+def roc_auc(
+    preds,
+    title="ROC Curves",
+    title_size=12,
+    label_size=8,
+    show=True,
+    save=False,
+    path="reports/figures/roc_auc.png",
+):
+    """Plots one-vs-rest ROC curves for each class from stored scores
+
+    Inputs
+    ------
+    preds: CleanFrame
+        As returned by loo_predict
+    See confusion_matrix for the remaining inputs
+
+    Outputs
+    -------
+    aucs: pd.Series
+        Area under the curve for each class
+    """
+    _check(title, path, show, save, title_size, label_size)
+    classes, truth, scores = get_scores(preds)
+
+    aucs = {}
+    for i, label in enumerate(classes):
+        fpr, tpr, _ = roc_curve(truth == label, scores[:, i])
+        aucs[label] = auc(fpr, tpr)
+        plt.plot(fpr, tpr, linewidth=1, label=f"{label} (AUC = {aucs[label]:.2f})")
+    plt.plot([0, 1], [0, 1], linestyle="--", color="gray", linewidth=1)
+
+    plt.xlabel("False positive rate", fontdict={"fontsize": label_size}, labelpad=5)
+    plt.ylabel("True positive rate", fontdict={"fontsize": label_size}, labelpad=10)
+    plt.tick_params(axis="both", labelsize=label_size)
+    plt.legend(fontsize=label_size, frameon=False)
+    _finish(title, title_size, show, save, path)
+    return pd.Series(aucs, name="auc")
+
+
+def precision_recall(
+    preds,
+    title="Precision-Recall Curves",
+    title_size=12,
+    label_size=8,
+    show=True,
+    save=False,
+    path="reports/figures/precision_recall.png",
+):
+    """Plots one-vs-rest precision-recall curves for each class from stored scores
+
+    Inputs
+    ------
+    preds: CleanFrame
+        As returned by loo_predict
+    See confusion_matrix for the remaining inputs
+
+    Outputs
+    -------
+    aps: pd.Series
+        Average precision for each class
+    """
+    _check(title, path, show, save, title_size, label_size)
+    classes, truth, scores = get_scores(preds)
+
+    aps = {}
+    for i, label in enumerate(classes):
+        precision, recall, _ = precision_recall_curve(truth == label, scores[:, i])
+        aps[label] = average_precision_score(truth == label, scores[:, i])
+        plt.step(
+            recall,
+            precision,
+            where="post",
+            linewidth=1,
+            label=f"{label} (AP = {aps[label]:.2f})",
+        )
+
+    plt.xlabel("Recall", fontdict={"fontsize": label_size}, labelpad=5)
+    plt.ylabel("Precision", fontdict={"fontsize": label_size}, labelpad=10)
+    plt.tick_params(axis="both", labelsize=label_size)
+    plt.legend(fontsize=label_size, frameon=False)
+    _finish(title, title_size, show, save, path)
+    return pd.Series(aps, name="average_precision")
+
+
+def _curve(curve, x, log, xlabel, title, title_size, label_size, show, save, path):
+    """Mean and spread of train and test scores across folds against x"""
+    _check(title, path, show, save, title_size, label_size)
+    for col in (x, "train_score", "test_score"):
+        if col not in curve.columns:
+            raise ValueError(f"curve has no {col} column")
+
+    summary = curve.groupby(x)[["train_score", "test_score"]].agg(["mean", "std"])
+    for score, color in (("train_score", "tab:blue"), ("test_score", "tab:green")):
+        mean, std = summary[(score, "mean")], summary[(score, "std")].fillna(0)
+        plt.plot(
+            summary.index, mean, marker="o", markersize=3, color=color, label=score
+        )
+        plt.fill_between(summary.index, mean - std, mean + std, alpha=0.2, color=color)
+    if log:
+        plt.xscale("log")
+
+    plt.xlabel(xlabel, fontdict={"fontsize": label_size}, labelpad=5)
+    plt.ylabel("Score", fontdict={"fontsize": label_size}, labelpad=10)
+    plt.tick_params(axis="both", labelsize=label_size)
+    plt.legend(fontsize=label_size, frameon=False)
+    _finish(title, title_size, show, save, path)
+    return summary
+
+
+def learning_curve(
+    curve,
+    title="Learning Curve",
+    title_size=12,
+    label_size=8,
+    show=True,
+    save=False,
+    path="reports/figures/learning_curve.png",
+):
+    """Plots train and test score against the number of training samples
+
+    Inputs
+    ------
+    curve: CleanFrame
+        Stored curve results with the columns train_size, fold, train_score and
+        test_score
+    See confusion_matrix for the remaining inputs
+
+    Outputs
+    -------
+    summary: pd.DataFrame
+        Mean and standard deviation of the scores for each train_size
+    """
+    return _curve(
+        curve,
+        "train_size",
+        False,
+        "Training samples",
+        title,
+        title_size,
+        label_size,
+        show,
+        save,
+        path,
+    )
+
+
+def validation_curve(
+    curve,
+    param,
+    log=True,
+    title="Validation Curve",
+    title_size=12,
+    label_size=8,
+    show=True,
+    save=False,
+    path="reports/figures/validation_curve.png",
+):
+    """Plots train and test score against the value of a parameter
+
+    Inputs
+    ------
+    curve: CleanFrame
+        Stored curve results with the columns param, fold, train_score and test_score
+    param: str
+        Name of the column holding the parameter values
+    log: bool, Optional
+        If true, use a log scale for the parameter
+    See confusion_matrix for the remaining inputs
+
+    Outputs
+    -------
+    summary: pd.DataFrame
+        Mean and standard deviation of the scores for each parameter value
+    """
+    if not isinstance(param, str):
+        raise ValueError("param must be a str")
+    if not isinstance(log, bool):
+        raise ValueError(f"{log} must be a bool")
+    return _curve(
+        curve, param, log, param, title, title_size, label_size, show, save, path
+    )
+
+
+if __name__ == "__main__":
+
+    for region in ("frontal", "cingulate"):
+        preds = pd.read_pickle(f"models/{region}_loo_predictions.pkl")
+        title = region.capitalize()
+        for plot in (confusion_matrix, roc_auc, precision_recall):
+            name = plot.__name__
+            plot(
+                preds,
+                title=f"{title} {name}",
+                show=False,
+                save=True,
+                path=f"reports/figures/{title}_{name}.png",
+            )
+            plt.close()
+
+        # Stored by src.models.curves
+        learning = pd.read_pickle(f"models/{region}_learning_curve.pkl")
+        learning_curve(
+            learning,
+            title=f"{title} learning_curve",
+            show=False,
+            save=True,
+            path=f"reports/figures/{title}_learning_curve.png",
+        )
+        plt.close()
+        validation = pd.read_pickle(f"models/{region}_validation_curve.pkl")
+        validation_curve(
+            validation,
+            "C",
+            title=f"{title} validation_curve",
+            show=False,
+            save=True,
+            path=f"reports/figures/{title}_validation_curve.png",
+        )
+        plt.close()
@@ -9,10 +9,14 @@ UMAP is an alternative to tSNE plotting and is a dimensionality reduction techni
 for visualising clusters
 """
 
+import os
+
 import matplotlib.pyplot as plt
 import pandas as pd
 
 import src.data.CleanFrame as cf
+from src.data.make_dataset import read_summary
+from src.features.build_features import build_sample_matrix, normalize
 
 
 def prep_volcano(cf):
@@ -35,21 +39,75 @@ def prep_umap(cf, col="label", vals=["q_score", "pep_score"]):
     """Prep data for umap plots
 
     Cleans off unnecessary columns information then aggregates by means
+    For make_data CleanFrames, build_sample_matrix avoids the full transpose
     """
     cf_clean = (
-        cf.T.reset_index()
+        cf.lazy()
+        .T.reset_index()
         .rename_axis(columns=None)
         .rename(columns={"level_0": "batch", "level_1": "label"})
         .filter_by_val(col=col, vals=vals, keep=False)
         .sort_values(by=["label"])
         .reset_index()
         .drop(columns=["index"])
+        .collect()
     )
     cf_clean["label"] = cf_clean["label"].str.extract("(\D+)", expand=False)
     cf_clean["label"] = cf_clean["label"].astype("category")
     return cf_clean
 
 
+def plot_volcanos(
+    volc, name, cols=("mean_ad", "mean_pd", "mean_adpd"), fig_dir="reports/figures"
+):
+    """Save a volcano plot of each group in the output of prep_volcano
+
+    Figures are written to <fig_dir>/<name>_<col>.png
+    """
+    for col in cols:
+        volc.volcano(
+            col,
+            "mean_q_score",
+            is_log=False,
+            title=f"{name} {col}",
+            show=False,
+            save=True,
+            path=os.path.join(fig_dir, f"{name}_{col}.png"),
+        )
+        plt.close()
+
+
+def plot_umaps(umap, name, cols=("label", "batch"), fig_dir="reports/figures"):
+    """Save UMAP plots of a prep_umap style frame, coloured by each of cols
+
+    The first two of two components are written to <fig_dir>/<name>_<col>.png and
+    the second and third of three to <fig_dir>/<name>_<col>_23.png
+    """
+    for col in cols:
+        # Plot first 2 dimensions
+        umap.umap(
+            (x for x in umap.columns if x not in ["label", "batch"]),
+            col,
+            title=f"{name} {col}",
+            show=False,
+            save=True,
+            path=os.path.join(fig_dir, f"{name}_{col}.png"),
+        )
+        plt.close()
+        # Reduces to 3 and plot 2 and third
+        umap.umap(
+            (x for x in umap.columns if x not in ["label", "batch"]),
+            col,
+            plt_comp=(1, 2),
+            title=f"{name} {col}",
+            show=False,
+            save=True,
+            path=os.path.join(fig_dir, f"{name}_{col}_23.png"),
+            n_components=3,
+        )
+        plt.close()
+
+
 if __name__ == "__main__":
 
     # Read in the data
@@ -59,8 +117,8 @@ if __name__ == "__main__":
     # Prep data
     frontal_volc = prep_volcano(frontal)
     cingulate_volc = prep_volcano(cingulate)
-    frontal_umap = prep_umap(frontal)
-    cingulate_umap = prep_umap(cingulate)
+    frontal_umap = build_sample_matrix(normalize(frontal)).to_frame()
+    cingulate_umap = build_sample_matrix(normalize(cingulate)).to_frame()
 
     # Save data
     pd.to_pickle(frontal_volc, "data/interim/frontal_volc.pkl")
@@ -69,56 +127,16 @@ if __name__ == "__main__":
     pd.to_pickle(cingulate_umap, "data/interim/cingulate_umap.pkl")
 
     # Plot data
-    data = ["mean_ad", "mean_pd", "mean_adpd"]
     for data in zip((frontal_volc, cingulate_volc), ("Frontal", "Cingulate")):
-        for col in ("mean_ad", "mean_pd", "mean_adpd"):
-            data[0].volcano(
-                col,
-                "mean_q_score",
-                is_log=False,
-                title=f"{data[1]} {col}",
-                show=False,
-                save=True,
-                path=f"reports/figures/{data[1]}_{col}.png",
-            )
-            plt.close()
+        plot_volcanos(data[0], data[1])
 
     for data in zip((frontal_umap, cingulate_umap), ("Frontal", "Cingulate")):
-        for col in ("label", "batch"):
-            # Plot first 2 dimensions
-            data[0].umap(
-                (x for x in data[0].columns if x not in ["label", "batch"]),
-                col,
-                title=f"{data[1]} {col}",
-                show=False,
-                save=True,
-                path=f"reports/figures/{data[1]}_{col}.png",
-            )
-            plt.close()
-            # Reduces to 3 and plot 2 and third
-            data[0].umap(
-                (x for x in data[0].columns if x not in ["label", "batch"]),
-                col,
-                plt_comp=(1, 2),
-                title=f"{data[1]} {col}",
-                show=False,
-                save=True,
-                path=f"reports/figures/{data[1]}_{col}_23.png",
-                n_components=3,
-            )
-            plt.close()
+        plot_umaps(data[0], data[1])
 
     # Examine their summary data
-    data = (
-        cf.CleanFrame(
-            pd.read_excel(
-                "references/TMT_Summary_Data.xlsx",
-                sheet_name=sheet,
-                header=(0, 2),
-                index=0,
-            )
-        )
-        for sheet in ("frontal cortex", "anterior cingulate gyrus")
+    data = read_summary(
+        "references/TMT_Summary_Data.xlsx",
+        sheets=("frontal cortex", "anterior cingulate gyrus"),
     )
 
     # Clean Data
@@ -1,11 +1,61 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-"""
-    Dummy conftest.py for faes_biof509_final.
+"""Shared fixtures: make_full, write_raw, raw_files and close_figures"""
 
-    If you don't know what this is for, just leave it empty.
-    Read more about conftest.py under:
-    https://pytest.org/latest/plugins.html
-"""
+import numpy as np
+import pandas as pd
+import pytest
 
-# import pytest
+import src.data.CleanFrame as cf
+
+
+def _make_full(n_batches=2, n_proteins=5, seed=0):
+    """Random CleanFrame laid out like the output of make_data"""
+    rng = np.random.RandomState(seed)
+    names = ["q_score", "pep_score", "ad1", "ad2", "control1", "control2", "pd1", "pd2"]
+    columns = pd.MultiIndex.from_product([range(1, n_batches + 1), names])
+    return cf.CleanFrame(
+        rng.lognormal(size=(n_proteins, len(columns))),
+        index=pd.Index([f"P{i}" for i in range(n_proteins)], name="accession"),
+        columns=columns,
+    )
+
+
+@pytest.fixture
+def make_full():
+    return _make_full
+
+
+def _write_raw(path, n_proteins=20, seed=0):
+    """Write a tab separated file laid out like the *__Proteins.txt batch files"""
+    rng = np.random.RandomState(seed)
+    raw = pd.DataFrame(
+        rng.lognormal(size=(n_proteins, 80)), columns=[f"c{i}" for i in range(80)]
+    )
+    raw["c2"] = np.where(np.arange(n_proteins) % 5, "IsMasterProtein", "NotMaster")
+    raw["c5"] = [f"P{i}" for i in range(n_proteins)]
+    raw.iloc[::7, 73] = np.nan
+    raw.to_csv(path, sep="\t", index=False)
+
+
+@pytest.fixture
+def close_figures():
+    """Close every figure a plotting test leaves open"""
+    yield
+    # Imported here so test modules can choose the backend first
+    import matplotlib.pyplot as plt
+
+    plt.close("all")
+
+
+@pytest.fixture
+def write_raw():
+    return _write_raw
+
+
+@pytest.fixture
+def raw_files(tmp_path):
+    """Directory holding two raw batch files, batch_1.txt and batch_2.txt"""
+    for i in (1, 2):
+        _write_raw(str(tmp_path / f"batch_{i}.txt"), seed=i)
+    return tmp_path
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.data.CleanFrame as cf
+
+
+@pytest.fixture
+def raw():
+    return cf.CleanFrame(
+        {
+            " Master ": ["IsMasterProtein", "no", "IsMasterProtein", "IsMasterProtein"],
+            " Q Score ": [1.0, 2.0, np.nan, 4.0],
+            " AD 1 ": [1.0, np.nan, 3.0, 4.0],
+            " AD 2 ": [np.nan, 2.0, 3.0, 4.0],
+        }
+    )
+
+
+def test_lazy_matches_eager(raw):
+    def chain(data):
+        return (
+            data.clean_cols()
+            .filter_by_val(col="master", vals=["IsMasterProtein"])
+            .drop(columns="master")
+            .dropna(subset=["q_score", "ad_1"])
+            .rename(columns={"ad_2": "control"})
+            .dropna(how="all")
+        )
+
+    lazy = chain(raw.lazy())
+    assert len(lazy.ops) == 6
+    result = lazy.collect()
+    assert isinstance(result, cf.CleanFrame)
+    pd.testing.assert_frame_equal(result, chain(raw))
+
+
+def test_lazy_eager_steps(make_full):
+    def chain(data):
+        return (
+            data.T.reset_index()
+            .rename(columns={"level_0": "batch", "level_1": "label"})
+            .filter_by_val(col="label", vals=["q_score", "pep_score"], keep=False)
+            .sort_values(by=["label"])
+            .reset_index()
+            .drop(columns=["index"])
+        )
+
+    full = make_full()
+    pd.testing.assert_frame_equal(chain(full.lazy()).collect(), chain(full))
+
+
+def test_explain_fuses(raw):
+    plan = (
+        raw.lazy()
+        .clean_cols()
+        .filter_by_val(col="master", vals=["IsMasterProtein"])
+        .drop(columns="master")
+        .dropna()
+        .explain()
+    )
+    assert plan.count("Fused stage") == 1
+    assert "Project: 3 of 4 columns" in plan
+    assert "q_score, ad_1, ad_2" in plan
+
+
+@pytest.mark.parametrize(
+    "chain",
+    [
+        lambda lazy: lazy,
+        lambda lazy: lazy.drop(columns=["missing"], errors="ignore"),
+        lambda lazy: lazy.clean_cols(),
+    ],
+)
+def test_collect_copies(raw, chain):
+    result = chain(raw.lazy()).collect()
+    assert result is not raw
+    result.iloc[0, 1] = -1.0
+    assert raw.iloc[0, 1] == 1.0
+
+
+def test_lazy_errors(raw):
+    with pytest.raises(ValueError):
+        raw.lazy().dropna(axis=1)
+    with pytest.raises(ValueError):
+        raw.lazy().filter_by_val(col="x", vals="y")
+    with pytest.raises(KeyError):
+        raw.lazy().drop(columns="missing").collect()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.data.CleanFrame as cf
+from src.data.make_dataset import NAMES, USECOLS, make_data
+from src.data.PartitionedFrame import PartitionedCleanFrame
+
+
+def test_partitioned_is_lazy():
+    def fail():
+        raise AssertionError("partition was read")
+
+    data = PartitionedCleanFrame([fail, fail], keys=["a", "b"]).clean_cols()
+    data = data.filter_by_val(col="a", vals=[1]).dropna()
+    assert len(data) == 2 and len(data.ops) == 3
+    with pytest.raises(ValueError):
+        data.dropna(axis=1)
+    with pytest.raises(ValueError):
+        data.clean_cols(inplace=True)
+    with pytest.raises(ValueError):
+        data.filter_by_val(col="a", vals="b")
+    with pytest.raises(ValueError):
+        data.clean_cols(lower=1)
+
+
+def test_partitioned_matches_eager():
+    frames = [
+        cf.CleanFrame({" A ": [1, 2, None], " B ": [3, 4, 5]}),
+        cf.CleanFrame({" A ": [1, 1, 2], " B ": [6, None, 8]}),
+    ]
+    lazy = PartitionedCleanFrame.from_frames(frames, keys=[1, 2])
+    lazy = lazy.clean_cols().filter_by_val(col="a", vals=[1]).dropna()
+    eager = pd.concat(
+        [i.clean_cols().filter_by_val(col="a", vals=[1]).dropna() for i in frames],
+        keys=[1, 2],
+    )
+    assert lazy.compute().equals(cf.CleanFrame(eager))
+
+
+def test_partitioned_positional_args():
+    frames = [cf.CleanFrame({" Master ": ["y", "n"], " A ": [1, 2]})] * 2
+    lazy = PartitionedCleanFrame.from_frames(frames).clean_cols(True, True, "_")
+    lazy = lazy.filter_by_val("master", ["y"]).drop("master", axis=1)
+    eager = frames[0].clean_cols(True, True, "_")
+    eager = eager.filter_by_val("master", ["y"]).drop("master", axis=1)
+    assert lazy.compute().equals(cf.CleanFrame(pd.concat([eager] * 2)))
+
+
+@pytest.mark.parametrize("chunksize", [None, 3])
+def test_make_data_partitioned(raw_files, chunksize):
+    kwargs = dict(usecols=USECOLS, names=NAMES, index_col=1)
+    files = str(raw_files / "batch_1.txt")
+    eager = make_data(files, **kwargs)
+    lazy = make_data(files, partitioned=True, chunksize=chunksize, **kwargs)
+    assert isinstance(lazy, PartitionedCleanFrame)
+    assert lazy.compute().equals(eager)
+
+    lazy = make_data(str(raw_files / "batch_*.txt"), partitioned=True, **kwargs)
+    paths = lazy.to_pickles(str(raw_files / "part_{}.pkl"))
+    assert [os.path.basename(i) for i in paths] == ["part_0.pkl", "part_1.pkl"]
+    assert pd.read_pickle(paths[0]).equals(eager)
+    full = lazy.compute(axis=1, keys=[1, 2], join="inner")
+    assert list(full.columns.levels[0]) == [1, 2]
+
+
+def test_make_data_keys_follow_sorted_files(tmp_path, write_raw):
+    for i in (3, 1, 2):
+        write_raw(str(tmp_path / f"batch_{i}.txt"), seed=i)
+    kwargs = dict(usecols=USECOLS, names=NAMES, index_col=1, axis=1, keys=[1, 2, 3])
+    files = str(tmp_path / "batch_*.txt")
+    eager = make_data(files, **kwargs)
+    assert make_data(files, partitioned=True, **kwargs).compute().equals(eager)
+    first = make_data(str(tmp_path / "batch_1.txt"), usecols=USECOLS, names=NAMES)
+    assert np.allclose(eager[1].dropna().to_numpy(), first.iloc[:, 1:].to_numpy())
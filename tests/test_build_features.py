@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+import src.data.CleanFrame as cf
+import src.features.build_features as bf
+from src.visualization.pre_visualize import prep_umap
+
+
+def test_sample_matrix_matches_prep_umap(make_full):
+    full = make_full()
+    expected = prep_umap(full)
+    matrix = bf.build_sample_matrix(full)
+    assert matrix.X.flags["C_CONTIGUOUS"]
+    assert matrix.X.dtype == np.float64
+    assert matrix.shape == (12, 5)
+    assert list(matrix.label) == list(expected["label"])
+    assert list(matrix.batch) == list(expected["batch"])
+    assert np.allclose(matrix.X, expected[list(full.index)].to_numpy(dtype=float))
+
+
+def test_sample_matrix_to_frame(make_full):
+    matrix = bf.build_sample_matrix(make_full())
+    frame = matrix.to_frame()
+    assert isinstance(frame, cf.CleanFrame)
+    assert list(frame.columns[:2]) == ["batch", "label"]
+    assert list(frame.index) == list(matrix.samples)
+    assert np.allclose(frame[list(matrix.proteins)].to_numpy(), matrix.X)
+
+
+def test_sample_matrix_type_check(make_full):
+    with pytest.raises(ValueError):
+        bf.build_sample_matrix(cf.CleanFrame({"A": [1, 2]}))
+    with pytest.raises(ValueError):
+        bf.build_sample_matrix(make_full(), sort=1)
+
+
+def test_normalize_median(make_full):
+    full = make_full(n_proteins=50)
+    new = bf.normalize(full, method="median")
+    channels = bf.channel_mask(full.columns)
+    for batch in (1, 2):
+        medians = np.median(new[batch].drop(columns=list(bf.SCORE_COLS)), axis=0)
+        assert np.allclose(medians, medians[0])
+    # Scores are untouched, and the operation is not in place
+    assert np.allclose(new.loc[:, ~channels], full.loc[:, ~channels])
+    assert not np.allclose(new.to_numpy(), full.to_numpy())
+
+
+def test_normalize_median_empty_channel(make_full):
+    full = make_full(n_proteins=50)
+    full[(1, "ad1")] = np.nan
+    for log in (True, False):
+        new = bf.normalize(full, method="median", log=log)
+        assert new[(1, "ad1")].isna().all()
+        assert new[1].drop(columns="ad1").notna().all().all()
+
+
+def test_normalize_quantile(make_full):
+    new = bf.normalize(make_full(n_proteins=50), method="quantile")
+    block = np.sort(new[1].drop(columns=list(bf.SCORE_COLS)).to_numpy(), axis=0)
+    assert np.allclose(block, block[:, [0]])
+
+
+def test_normalize_quantile_missing(make_full):
+    full = make_full(n_proteins=50)
+    full.iloc[:5, 3] = np.nan
+    new = bf.normalize(full, method="quantile")
+    assert new.iloc[:5, 3].isna().all()
+    assert new.iloc[5:, 3].notna().all()
+
+
+def test_normalize_reference(make_full):
+    full = make_full()
+    new = bf.normalize(full, method="reference", reference="control1")
+    assert np.allclose(new.xs("control1", axis=1, level=1), 0)
+    with pytest.raises(ValueError):
+        bf.normalize(full, method="reference", reference="nope")
+    with pytest.raises(ValueError):
+        bf.normalize(full, method="mean")
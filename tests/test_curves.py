@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+from sklearn.linear_model import SGDClassifier  # noqa: E402
+
+import src.data.CleanFrame as cf  # noqa: E402
+from src.features.build_features import build_sample_matrix  # noqa: E402
+from src.models.curves import loo_learning_curve, loo_validation_curve  # noqa: E402
+from src.visualization.post_visualize import learning_curve  # noqa: E402
+from src.visualization.post_visualize import validation_curve  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("close_figures")
+
+
+@pytest.fixture
+def matrix(make_full):
+    full = make_full(n_batches=3, n_proteins=10)
+    for batch in range(1, 4):
+        full.loc["P0", (batch, "ad1")] = full.loc["P0", (batch, "ad2")] = 50
+    return build_sample_matrix(full)
+
+
+def test_learning_curve(matrix):
+    curve = loo_learning_curve(matrix, train_sizes=[0.5, 1.0], random_state=0)
+    assert isinstance(curve, cf.CleanFrame)
+    assert len(curve) == 2 * len(matrix)
+    assert sorted(curve["train_size"].unique()) == [8, 17]
+    assert curve[["train_score", "test_score"]].stack().between(0, 1).all()
+    summary = learning_curve(curve, show=False)
+    assert list(summary.index) == sorted(curve["train_size"].unique())
+
+
+def test_learning_curve_partial_fit_parallel(matrix):
+    kwargs = dict(
+        estimator=SGDClassifier(random_state=0), train_sizes=[6, 12], random_state=1
+    )
+    serial = loo_learning_curve(matrix, **kwargs)
+    parallel = loo_learning_curve(matrix, n_jobs=2, **kwargs)
+    assert np.allclose(serial["test_score"], parallel["test_score"])
+    with pytest.raises(ValueError):
+        loo_learning_curve(matrix, train_sizes=[2])
+
+
+def test_validation_curve(matrix):
+    curve = loo_validation_curve(matrix, values=[0.05, 1.0])
+    assert list(curve.columns[:2]) == ["fold", "C"]
+    means = curve.groupby("C")["test_score"].mean()
+    assert means[1.0] >= means[0.05]
+    validation_curve(curve, "C", show=False)
+    with pytest.raises(ValueError):
+        loo_validation_curve(matrix, param="not_a_param")
+
+
+def test_curves_refit_ensembles(matrix):
+    # warm_start on a forest would keep the first point's trees
+    forest = RandomForestClassifier(n_estimators=5, warm_start=True, random_state=0)
+    curve = loo_validation_curve(
+        matrix, param="max_depth", values=[1, None], estimator=forest
+    )
+    scores = curve.groupby("max_depth", dropna=False)["train_score"].mean()
+    assert scores.iloc[1] > scores.iloc[0]
+    # Unbootstrapped trees fit their whole training set, unless left from size 6
+    forest.set_params(bootstrap=False)
+    curve = loo_learning_curve(
+        matrix, estimator=forest, train_sizes=[6, 17], random_state=0
+    )
+    assert (curve["fit_time"] > 0).all()
+    assert (curve["train_score"] == 1).all()
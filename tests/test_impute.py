@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+import src.features.impute as im
+
+
+@pytest.fixture
+def with_missing(make_full):
+    full = make_full(n_proteins=60)
+    rng = np.random.RandomState(0)
+    holes = rng.rand(*full.shape) < 0.1
+    holes[:, [0, 1, 8, 9]] = False  # keep the score columns complete
+    return full.mask(holes)
+
+
+def test_impute_knn_matches_brute_force():
+    rng = np.random.RandomState(1)
+    X = rng.normal(size=(40, 6))
+    X[rng.rand(40, 6) < 0.15] = np.nan
+    new = im.impute_knn(X, k=3, block_size=4)
+
+    donors = X[~np.isnan(X).any(axis=1)]
+    for i in np.flatnonzero(np.isnan(X).any(axis=1)):
+        obs = ~np.isnan(X[i])
+        dist = ((donors[:, obs] - X[i, obs]) ** 2).sum(axis=1)
+        expected = donors[np.argsort(dist)[:3]].mean(axis=0)
+        assert np.allclose(new[i, ~obs], expected[~obs])
+        assert np.allclose(new[i, obs], X[i, obs])
+
+
+def test_impute_minprob_left_censored():
+    rng = np.random.RandomState(2)
+    X = rng.normal(loc=20, size=(200, 4))
+    X[:20, 0] = np.nan
+    new = im.impute_minprob(X, random_state=0)
+    assert not np.isnan(new).any()
+    assert new[:20, 0].mean() < np.nanmean(X[:, 0])
+
+
+@pytest.mark.parametrize("method", ["minprob", "knn"])
+def test_impute_by_batch(method, with_missing):
+    serial = im.impute(with_missing, method=method, random_state=0)
+    parallel = im.impute(with_missing, method=method, random_state=0, n_jobs=2)
+    assert not serial.isna().any().any()
+    assert np.allclose(serial.to_numpy(), parallel.to_numpy())
+    assert with_missing.isna().any().any()  # Insure operation is not inplace
+
+
+def test_impute_knn_missed_by_batch(make_full):
+    full = make_full(n_proteins=40)
+    full.loc[["P1", "P2"], 2] = np.nan
+    new = im.impute(full, method="knn", k=3)
+    assert np.allclose(new[1], full[1])
+    # Neighbours found from batch 1, not the same fallback for both
+    missed = new[2].drop(columns=["q_score", "pep_score"])
+    assert missed.notna().all().all()
+    assert not np.allclose(missed.loc["P1"], missed.loc["P2"])
+
+
+def test_impute_type_check(with_missing):
+    with pytest.raises(ValueError):
+        im.impute(with_missing, method="mean")
+    with pytest.raises(ValueError):
+        im.impute(with_missing, n_jobs=0)
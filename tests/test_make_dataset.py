@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import pandas as pd
+import pytest
+
+import src.data.CleanFrame as cf
+import src.data.make_dataset as md
+
+
+def write_workbook(path, value):
+    pytest.importorskip("openpyxl")
+    rows = pd.DataFrame(
+        [["Summary", "batch 1", "batch 1"], ["", "", ""], ["accession", "AD1", "PD1"]]
+        + [[f"P{i}", value + i, value - i] for i in range(3)]
+    )
+    with pd.ExcelWriter(path) as writer:
+        for sheet in ("one", "two"):
+            rows.to_excel(writer, sheet_name=sheet, header=False, index=False)
+
+
+def test_read_summary_caches(tmp_path, monkeypatch):
+    path, cache_dir = str(tmp_path / "summary.xlsx"), str(tmp_path / "cache")
+    write_workbook(path, 10)
+    first = md.read_summary(path, sheets=("one", "two"), cache_dir=cache_dir)
+    assert all(isinstance(i, cf.CleanFrame) for i in first)
+    assert first[0].columns.nlevels == 2
+    assert len(os.listdir(cache_dir)) == 2
+
+    # A warm cache never parses the workbook, even after it is touched
+    def fail(args):
+        raise AssertionError("workbook was parsed")
+
+    monkeypatch.setattr(md, "_read_sheet", fail)
+    os.utime(path, (0, 0))
+    second = md.read_summary(path, sheets=("one", "two"), cache_dir=cache_dir)
+    assert all(a.equals(b) for a, b in zip(first, second))
+
+    # The hash hit refreshed the cached mtime and size, so no rehash is needed
+    monkeypatch.setattr(md, "_file_hash", fail)
+    md.read_summary(path, sheets=("one", "two"), cache_dir=cache_dir)
+
+
+def test_read_summary_invalidates(tmp_path):
+    path, cache_dir = str(tmp_path / "summary.xlsx"), str(tmp_path / "cache")
+    write_workbook(path, 10)
+    first = md.read_summary(path, sheets=("one",), cache_dir=cache_dir, n_jobs=1)
+    write_workbook(path, 20)
+    second = md.read_summary(path, sheets=("one",), cache_dir=cache_dir, n_jobs=1)
+    assert not first[0].equals(second[0])
+
+
+def test_read_summary_type_check(tmp_path):
+    with pytest.raises(ValueError):
+        md.read_summary(sheets="one")
+    with pytest.raises(ValueError):
+        md.read_summary(n_jobs=0)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+import src.models.permutation_test as pt
+from src.features.build_features import build_sample_matrix
+from src.models.train_model import make_classifier
+
+
+@pytest.fixture
+def matrix(make_full):
+    full = make_full(n_batches=3, n_proteins=15)
+    # Make the first two proteins track the label
+    for batch in range(1, 4):
+        full.loc["P0", (batch, "ad1")] = full.loc["P0", (batch, "ad2")] = 50
+        full.loc["P1", (batch, "pd1")] = full.loc["P1", (batch, "pd2")] = 50
+    return build_sample_matrix(full)
+
+
+def test_permute_within_strata():
+    y = np.array(list("aabbccdd"))
+    strata = np.array([1, 1, 1, 1, 2, 2, 2, 2])
+    y_perm = pt.permute(y, strata, random_state=0)
+    assert sorted(y_perm[:4]) == sorted(y[:4])
+    assert sorted(y_perm[4:]) == sorted(y[4:])
+
+
+def test_fold_scaling():
+    X = np.random.RandomState(0).normal(size=(6, 3))
+    means, scales = pt._fold_scaling(X)
+    assert np.allclose(means[2], X[np.arange(6) != 2].mean(axis=0))
+    assert np.allclose(scales[2], X[np.arange(6) != 2].std(axis=0))
+
+
+def test_permutation_test_early_stop(matrix):
+    score, scores, p_value = pt.permutation_test(
+        matrix,
+        estimator=make_classifier(C=1).steps[-1][1],
+        n_permutations=100,
+        batch_size=5,
+        alpha=0.2,
+        confidence=0.9,
+        random_state=0,
+        verbose=False,
+    )
+    assert score > 0.8
+    assert scores.size < 100
+    assert p_value < 0.2
+
+
+def test_permutation_test_parallel_deterministic(matrix):
+    kwargs = dict(n_permutations=8, batch_size=2, random_state=1, verbose=False)
+    serial = pt.permutation_test(matrix, early_stop=False, **kwargs)
+    parallel = pt.permutation_test(matrix, early_stop=False, n_jobs=2, **kwargs)
+    assert serial[0] == parallel[0] and serial[2] == parallel[2]
+    assert np.allclose(serial[1], parallel[1])
+
+
+def test_permutation_test_type_check(matrix):
+    with pytest.raises(ValueError):
+        pt.permutation_test(matrix, n_permutations=0)
+    with pytest.raises(ValueError):
+        pt.permutation_test(matrix, alpha=2)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import pandas as pd
+import pytest
+
+import src.pipeline as pl
+
+
+@pytest.fixture
+def opts(tmp_path, write_raw):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    for i in range(1, 3):
+        write_raw(str(raw / f"frontal_batch {i}__Proteins.txt"), seed=i)
+        write_raw(str(raw / f"cingulate_batch {i}__Proteins.txt"), seed=i + 2)
+    paths = {"raw": str(raw), "interim": str(tmp_path), "models": str(tmp_path)}
+    paths["figures"] = str(tmp_path / "figures")
+    return dict(paths, impute="knn", normalize="median")
+
+
+def test_downstream():
+    assert pl.downstream("prep") == {"prep", "plot", "train"}
+    assert pl.downstream("load") == set(pl.STAGES)
+
+
+def test_run_parallel(opts):
+    stages = ["load", "clean", "normalize", "prep", "train"]
+    timings = pl.run(["frontal", "cingulate"], stages, opts, jobs=2)
+    assert list(timings.index) == stages
+    assert list(timings.columns) == ["frontal", "cingulate"]
+    assert timings.notna().all().all()
+    full = pd.read_pickle(os.path.join(opts["interim"], "frontal_full.pkl"))
+    assert not full.isna().any().any()
+    assert os.path.exists(os.path.join(opts["models"], "cingulate_loo_predictions.pkl"))
+
+    # Resuming reruns only the selected stages, from what is already on disk
+    timings = pl.run(["frontal"], ["prep", "train"], opts)
+    assert list(timings.index) == ["prep", "train"]
+
+
+def test_plot_writes_to_figures(opts, tmp_path, monkeypatch):
+    # UMAP is slow to compile, so only record where its figures would go
+    umaps = []
+    monkeypatch.setattr(pl, "plot_umaps", lambda *args, **kwargs: umaps.append(kwargs))
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(opts["figures"])
+    stages = ["load", "clean", "normalize", "prep", "plot"]
+    pl.run(["frontal"], stages, dict(opts, impute="none"))
+    assert "Frontal_mean_ad.png" in os.listdir(opts["figures"])
+    assert umaps == [{"fig_dir": opts["figures"]}]
+    assert not os.path.exists(tmp_path / "reports")
+
+
+def test_minprob_survives_normalize(opts):
+    opts = dict(opts, impute="minprob")
+    pl.run(["frontal"], ["load", "clean", "normalize"], opts)
+    raw = pd.read_pickle(os.path.join(opts["interim"], "frontal_raw.pkl"))
+    full = pd.read_pickle(os.path.join(opts["interim"], "frontal_full.pkl"))
+    norm = pd.read_pickle(os.path.join(opts["interim"], "frontal_norm.pkl"))
+    assert raw.isna().any().any()
+    assert (full.to_numpy() > 0).all()
+    assert not norm.isna().any().any()
+
+
+def test_run_type_check(opts):
+    with pytest.raises(ValueError):
+        pl.run(["occipital"], ["load"], opts)
+    with pytest.raises(ValueError):
+        pl.run(["frontal"], ["load"], opts, jobs=0)
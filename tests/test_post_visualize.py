@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+import src.data.CleanFrame as cf  # noqa: E402
+import src.visualization.post_visualize as pv  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("close_figures")
+
+
+@pytest.fixture
+def preds():
+    return cf.CleanFrame(
+        {
+            "fold": range(4),
+            "true": ["ad", "ad", "pd", "pd"],
+            "pred": ["ad", "pd", "pd", "pd"],
+            "score_ad": [0.9, 0.4, 0.2, 0.1],
+            "score_pd": [0.1, 0.6, 0.8, 0.9],
+        }
+    )
+
+
+def test_confusion_matrix(preds):
+    matrix = pv.confusion_matrix(preds, show=False)
+    assert matrix.loc["ad", "ad"] == 1 and matrix.loc["ad", "pd"] == 1
+    assert matrix.loc["pd", "pd"] == 2 and matrix.loc["pd", "ad"] == 0
+    assert np.allclose(pv.confusion_matrix(preds, normalize=True, show=False).sum(1), 1)
+
+
+def test_roc_and_precision_recall(preds):
+    assert pv.roc_auc(preds, show=False)["ad"] == 1
+    assert pv.precision_recall(preds, show=False)["pd"] == 1
+
+
+def test_curves():
+    curve = cf.CleanFrame(
+        {
+            "C": [0.1, 0.1, 1, 1],
+            "fold": [0, 1, 0, 1],
+            "train_score": [0.5, 0.7, 1, 1],
+            "test_score": [0.5, 0.5, 0, 1],
+        }
+    )
+    summary = pv.validation_curve(curve, "C", show=False)
+    assert np.allclose(summary[("test_score", "mean")], [0.5, 0.5])
+    with pytest.raises(ValueError):
+        pv.learning_curve(curve, show=False)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.data.qc as qc
+
+
+def test_moments_merge():
+    rng = np.random.RandomState(0)
+    values = rng.normal(size=(50, 3))
+    values[::4, 1] = np.nan
+    whole, parts = qc.Moments(3), qc.Moments(3)
+    whole.update(values)
+    for block in np.array_split(values, 7):
+        parts.update(block)
+    assert np.allclose(whole.mean, np.nanmean(values, axis=0))
+    assert np.allclose(whole.std, np.nanstd(values, axis=0, ddof=1))
+    assert np.allclose(parts.mean, whole.mean) and np.allclose(parts.m2, whole.m2)
+    assert np.allclose(parts.min, np.nanmin(values, axis=0))
+
+
+def test_qc_file_single_pass(raw_files):
+    path = str(raw_files / "batch_1.txt")
+    whole = qc.qc_file(path, chunksize=100).summary()
+    chunked = qc.qc_file(path, chunksize=3).summary()
+    assert np.allclose(whole.to_numpy(), chunked.to_numpy(), equal_nan=True)
+    assert whole.loc["ad2", "n_missing"] == 3
+    assert whole.loc["ad1", "n_missing"] == 0
+    assert whole["n_master"].iloc[0] == 16 and whole["n_non_master"].iloc[0] == 4
+
+
+def test_qc_report(raw_files):
+    files = str(raw_files / "batch_*.txt")
+    out_dir = str(raw_files / "interim")
+    serial = qc.qc_report(files, out_dir=out_dir)
+    parallel = qc.qc_report(files, n_jobs=2, out_dir=None)
+    assert list(serial.index.levels[0]) == ["batch_1.txt", "batch_2.txt"]
+    assert np.allclose(serial.to_numpy(), parallel.to_numpy(), equal_nan=True)
+    assert pd.read_pickle(os.path.join(out_dir, "qc_report.pkl")).equals(serial)
+    with pytest.raises(ValueError):
+        qc.qc_report(str(raw_files / "nothing*"))
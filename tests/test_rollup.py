@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+import src.data.CleanFrame as cf
+from src.data.rollup import rollup
+
+
+@pytest.fixture
+def peptides():
+    rng = np.random.RandomState(0)
+    n = 200
+    data = cf.CleanFrame(
+        {
+            "accession": rng.choice([f"P{i}" for i in range(30)], size=n),
+            "master": np.where(rng.rand(n) < 0.9, "IsMasterProtein", "Other"),
+            "ad1": rng.lognormal(size=n),
+            "pd1": rng.lognormal(size=n),
+        }
+    )
+    data.loc[::6, "pd1"] = np.nan
+    return data
+
+
+@pytest.mark.parametrize("how", ["median", "sum"])
+def test_rollup_matches_groupby(peptides, how):
+    result = rollup(peptides, how=how)
+    masters = peptides.filter_by_val(col="master", vals=["IsMasterProtein"])
+    grouped = masters.groupby("accession")[["ad1", "pd1"]]
+    expected = grouped.median() if how == "median" else grouped.sum(min_count=1)
+    assert list(result.index) == list(expected.index)
+    assert np.allclose(result[["ad1", "pd1"]], expected, equal_nan=True)
+    assert (result["n_peptides"] == grouped.size()).all()
+
+
+def test_rollup_top(peptides):
+    result = rollup(peptides, how="top", n=2, master=None)
+    for accession, group in peptides.groupby("accession"):
+        totals = group[["ad1", "pd1"]].sum(axis=1)
+        top = group.loc[totals.sort_values(ascending=False, kind="mergesort").index[:2]]
+        assert np.allclose(
+            result.loc[accession, ["ad1", "pd1"]].to_numpy(dtype=float),
+            top[["ad1", "pd1"]].mean().to_numpy(),
+            equal_nan=True,
+        )
+
+
+def test_rollup_type_check(peptides):
+    with pytest.raises(ValueError):
+        rollup(peptides, how="mean")
+    with pytest.raises(ValueError):
+        rollup(peptides, n=0)
+    with pytest.raises(ValueError):
+        rollup(peptides, protein="gene")
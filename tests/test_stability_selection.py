@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+import src.data.CleanFrame as cf
+from src.features.build_features import build_sample_matrix
+from src.models.stability_selection import stability_selection
+
+
+def test_stability_selection_finds_signal(make_full):
+    full = make_full(n_batches=4, n_proteins=30)
+    # Make the first protein track the label
+    for batch in range(1, 5):
+        full.loc["P0", (batch, "ad1")] = full.loc["P0", (batch, "ad2")] = 50
+    matrix = build_sample_matrix(full)
+    freqs = stability_selection(matrix, C=0.5, n_resamples=20, random_state=0)
+    assert isinstance(freqs, cf.CleanFrame)
+    assert freqs["selection_freq"].between(0, 1).all()
+    assert freqs["selection_freq"].idxmax() == "P0"
+
+
+def test_stability_selection_parallel_deterministic(make_full):
+    frame = build_sample_matrix(make_full(n_batches=4, n_proteins=30)).to_frame()
+    serial = stability_selection(frame, n_resamples=12, chunk_size=5, random_state=3)
+    parallel = stability_selection(
+        frame, n_resamples=12, chunk_size=5, random_state=3, n_jobs=2
+    )
+    assert np.allclose(serial, parallel)
+
+
+def test_stability_selection_type_check(make_full):
+    matrix = build_sample_matrix(make_full())
+    with pytest.raises(ValueError):
+        stability_selection(matrix, n_resamples=0)
+    with pytest.raises(ValueError):
+        stability_selection(matrix, sample_fraction=2)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+from sklearn.svm import LinearSVC  # noqa: E402
+
+import src.models.train_model as tm  # noqa: E402
+import src.visualization.post_visualize as pv  # noqa: E402
+from src.features.build_features import build_sample_matrix  # noqa: E402
+
+
+@pytest.fixture
+def binary():
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(40, 200))
+    y = (X[:, 0] + 0.5 * X[:, 1] + 0.3 * rng.normal(size=40) > 0).astype(int)
+    return X, y
+
+
+def test_logistic_path_kkt(binary):
+    X, y = binary
+    path = tm.LogisticPath(n_alphas=30, tol=1e-8).fit(X, y)
+    assert np.all(np.diff(path.alphas_) < 0)
+    assert path.n_selected()[-1] > path.n_selected()[0]
+    # Check optimality of every solution on the path, on all proteins
+    Xs = (X - path.mean_) / path.scale_
+    for alpha, coef, b0 in zip(path.alphas_, path.coef_[:, 0], path.intercept_[:, 0]):
+        grad = Xs.T @ (y - tm._sigmoid(b0 + Xs @ coef)) / len(y)
+        active = coef != 0
+        assert np.all(np.abs(grad[~active]) <= alpha * (1 + 1e-4))
+        assert np.allclose(grad[active], alpha * np.sign(coef[active]), atol=1e-4)
+
+
+def test_logistic_path_multiclass(make_full):
+    matrix = build_sample_matrix(make_full(n_batches=4, n_proteins=20))
+    X, y, _ = tm.get_xy(matrix)
+    path = tm.LogisticPath(n_alphas=10, l1_ratio=0.5).fit(X, y)
+    assert path.coef_.shape == (10, 3, 20)
+    assert path.predict(X).shape == (10, len(y))
+    assert set(path.predict(X).ravel()) <= set(y)
+
+
+def test_loo_path_scores(make_full):
+    frame = build_sample_matrix(make_full(n_batches=2, n_proteins=10)).to_frame()
+    scores = tm.loo_path_scores(frame, n_alphas=5)
+    assert list(scores.columns) == ["accuracy", "n_selected"]
+    assert len(scores) == 5
+    assert scores["accuracy"].between(0, 1).all()
+
+
+def test_logistic_path_type_check():
+    with pytest.raises(ValueError):
+        tm.LogisticPath(l1_ratio=0)
+    with pytest.raises(ValueError):
+        tm.LogisticPath(n_alphas=0)
+
+
+def test_loo_predict(make_full):
+    matrix = build_sample_matrix(make_full(n_batches=2, n_proteins=10))
+    preds = tm.loo_predict(matrix)
+    assert len(preds) == len(matrix)
+    assert list(preds["sample"]) == list(matrix.samples)
+    assert {"score_ad", "score_control", "score_pd"} <= set(preds.columns)
+    assert np.allclose(preds.filter(like="score_").sum(axis=1), 1)
+    assert (preds["train_size"] == len(matrix) - 1).all()
+
+
+@pytest.mark.usefixtures("close_figures")
+def test_loo_predict_binary_decision_function(make_full):
+    matrix = build_sample_matrix(make_full(n_batches=2, n_proteins=10))
+    frame = matrix.to_frame()
+    frame = frame[frame["label"] != "control"]
+    frame["label"] = frame["label"].cat.remove_unused_categories()
+    preds = tm.loo_predict(frame, estimator=LinearSVC())
+    assert list(preds["sample"]) == list(frame.index)
+    assert not preds[["score_ad", "score_pd"]].isna().any().any()
+    assert np.allclose(preds["score_ad"], -preds["score_pd"])
+    assert pv.roc_auc(preds, show=False).notna().all()
+    assert pv.precision_recall(preds, show=False).notna().all()